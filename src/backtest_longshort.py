@@ -15,83 +15,163 @@ This script performs the following tasks:
 9. Plots the portfolio's performance.
 10. Visualizes the long and short portfolio composition for each unique date.
 
+Cleaned trades and prices are cached as Parquet files in --cache_dirname and reused on reruns as long as
+the Capitol trades file and the price files are unchanged. The price files are also collected into a single
+Parquet price store, which is only rebuilt when the price files change. Pass --no-use_cache to always rebuild them.
+
 Usage:
 Simply run the script to execute the backtest and visualization processes. Ensure that all required arguments 
 and data paths are set appropriately. See README for more details.
 """
 
 import os
+import re
 import pathlib
+import hashlib
 from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import pandas as pd
 
 import argparse
 
+import matplotlib
 import matplotlib.pyplot as plt
 
-from utils import compute_average_from_range, check_float_in_range
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
 
-import yfinance as yf
-from pandas_datareader import data as pdr
+from utils import check_float_in_range
 
-yf.pdr_override()
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """Leaves the decorated function uncompiled when numba is not installed."""
+        return lambda func: func
 
+import yfinance as yf
 
-def clean_capitol_trades_data(df, path_to_prices):
+PRICE_CONVERT_OPTIONS = pv.ConvertOptions(
+    include_columns=['Date', 'Close'],
+    column_types={'Date': pa.timestamp('ns'), 'Close': pa.float32()},
+    )
+
+TRADES_CONVERT_OPTIONS = pv.ConvertOptions(
+    include_columns=['politician', 'trade_issuer', 'ticker', 'traded', 'owner', 'type', 'size', 'price'],
+    column_types={
+        'traded': pa.timestamp('ns'),
+        'owner': pa.dictionary(pa.int32(), pa.string()),
+        'politician': pa.dictionary(pa.int32(), pa.string()),
+        'type': pa.dictionary(pa.int32(), pa.string()),
+        'ticker': pa.dictionary(pa.int32(), pa.string()),
+        'size': pa.dictionary(pa.int32(), pa.string()),
+        'trade_issuer': pa.string(),
+        'price': pa.string(),
+        },
+    strings_can_be_null=True,
+    )
+
+# Size buckets look like ' 15K–50K' (lower and upper bound with an optional thousand/million suffix)
+SIZE_BUCKET_PATTERN = re.compile(r'\s*(\d+)\s*([KM]?)\s*[–-]\s*(\d+)\s*([KM]?)')
+SIZE_MULTIPLIERS = {'': 1.0, 'K': 1e3, 'M': 1e6}
+
+
+def day_of_week(dates):
     """
-    Cleans the Capitol Trades data to format tickers, filter trades, and prepare the data for analysis.
+    Computes the day of the week (Monday=0, Sunday=6) of datetime values with integer arithmetic.
 
     Parameters:
-    - df (pd.DataFrame): DataFrame containing the Capitol Trades data with columns such as 'ticker', 'size', 'owner', 'type', and 'traded'.
-    - path_to_prices (str): Path to the directory containing the CSV price files.
+    - dates (array-like of datetime64): Dates for which the day of the week is computed.
 
     Returns:
-    - pd.DataFrame: A cleaned DataFrame containing the formatted and processed Capitol Trades data.
+    - np.ndarray: Integer array with the day of the week of each date.
     """
-    # Format tickers to correspond with pricing data
-    df.dropna(subset=['ticker'], inplace=True)
-    df['ticker'] = df['ticker'].apply(lambda x: x.strip(':US'))
-    df['ticker'] = df['ticker'].astype('category')
-
-    # Check which firms have price data
-    firms = [x.strip('.csv') for x in os.listdir(path_to_prices)]
-
-    # Drop trades the don't have pricing data
-    df = df[df.ticker.isin(firms)]
+    days = np.asarray(dates).astype('datetime64[D]').astype('int64')
+    return (days + 3) % 7  # 1970-01-01 was a Thursday
 
-    # Drop small trades
-    df = df[df['size'] != ' < 1K']
 
-    # Drop trades by children
-    df = df[df['owner'] != ' Child']
-    df['owner'] = df['owner'].cat.remove_unused_categories()
+def load_capitol_trades(capitoltrades_fl):
+    """
+    Loads the raw Capitol Trades data with the columns needed for the backtest.
 
-    # Convert upperbound of size bucket to log scale score (to make linear)
-    df['size_score'] = df['size'].apply(lambda x: np.log(float(x.split('–')[-1].replace('K', '000').replace('M', '000000'))))
+    Parameters:
+    - capitoltrades_fl (str): Path to the Capitol Trades CSV file.
 
-    # Assume position is average of bucket's upper and lower bound
-    df['average_size'] = df['size'].apply(compute_average_from_range)
+    Returns:
+    - pd.DataFrame: DataFrame with 'traded' parsed to datetime and 'owner', 'politician', 'ticker', 'type' and 'size'
+                    as categories.
+    """
+    return pv.read_csv(capitoltrades_fl, convert_options=TRADES_CONVERT_OPTIONS).to_pandas()
 
-    df.drop(columns=['size'], inplace=True)
 
-    # Drop exchanges and recieves (because I don't know what they are)
-    df = df[df['type'].isin([' buy', ' sell'])]
-    df['type'] = df['type'].cat.remove_unused_categories()
+def clean_capitol_trades_data(df, path_to_prices):
+    """
+    Cleans the Capitol Trades data to format tickers, filter trades, and prepare the data for analysis.
 
-    # Convert buy/sell to 1/-1
-    df['type_bool'] = (df['type'] == ' buy').astype(int) * 2 - 1
-    df.drop(columns=['type'], inplace=True)
+    Parameters:
+    - df (pd.DataFrame): DataFrame containing the Capitol Trades data with columns such as 'ticker', 'size', 'owner', 'type', and 'traded'.
+                         'ticker' and 'size' should be categorical (see `load_capitol_trades`).
+    - path_to_prices (str): Path to the directory containing the CSV price files.
 
-    # Convert size_score to contain buy/sell information
-    df['size_score'] *= df['type_bool']
-    df['average_size'] *= df['type_bool']
+    Returns:
+    - pd.DataFrame: A cleaned DataFrame containing the formatted and processed Capitol Trades data.
+    """
+    # Format tickers to correspond with pricing data, once per category rather than once per trade
+    tickers = df['ticker'].cat.categories.str.replace(r':US$', '', regex=True)
+    ticker_codes = df['ticker'].cat.codes.to_numpy()
 
-    # Round date to nearest friday (to get week closing price)
-    df['week_date'] = pd.to_datetime(df.traded.dt.to_period('W').dt.end_time.dt.date - timedelta(days=2))
+    # Check which firms have price data
+    firms = {p.stem for p in pathlib.Path(path_to_prices).glob('*.csv')}
+
+    # Select all trades to keep with a single mask
+    keep = (
+        # Drop trades the don't have pricing data (the appended False is picked up by code -1, i.e. a missing ticker)
+        np.append(tickers.isin(firms), False)[ticker_codes]
+        # Drop small trades
+        & (df['size'] != ' < 1K').to_numpy()
+        # Drop trades by children
+        & (df['owner'] != ' Child').to_numpy()
+        # Drop exchanges and recieves (because I don't know what they are)
+        & df['type'].isin([' buy', ' sell']).to_numpy()
+        )
 
-    return df
+    # Split each size bucket (e.g. ' 15K–50K') into numeric lower and upper bounds
+    parts = df['size'].cat.categories.to_series().str.extract(SIZE_BUCKET_PATTERN)
+    bucket_lower = (parts[0].astype(float) * parts[1].map(SIZE_MULTIPLIERS)).to_numpy()
+    bucket_upper = (parts[2].astype(float) * parts[3].map(SIZE_MULTIPLIERS)).to_numpy()
+
+    # Compute the scores once per bucket and gather them by category code.
+    # The appended NaN row is picked up by code -1, i.e. a missing size.
+    bucket_scores = np.vstack([
+        np.column_stack([
+            # Convert upperbound of size bucket to log scale score (to make linear)
+            np.log(bucket_upper),
+            # Assume position is average of bucket's upper and lower bound
+            0.5 * (bucket_lower + bucket_upper),
+            ]),
+        [np.nan, np.nan],
+        ])
+    scores = bucket_scores[df['size'].cat.codes.to_numpy()[keep]]
+
+    # Convert buy/sell to 1/-1 by looking up the sign of each type category
+    sign_lut = np.where(df['type'].cat.categories == ' buy', 1, -1).astype(np.int8)
+    type_bool = sign_lut[df['type'].cat.codes.to_numpy()[keep]]
+
+    # Round date to the friday of its (Monday to Sunday) week (to get week closing price)
+    traded_days = df['traded'].to_numpy()[keep].astype('datetime64[D]')
+    week_date = (traded_days + (4 - day_of_week(traded_days)).astype('timedelta64[D]')).astype('datetime64[ns]')
+
+    return df.loc[keep, df.columns.drop(['size', 'type'])].assign(
+        ticker=pd.Categorical(tickers[ticker_codes[keep]]),
+        # Convert size_score and average_size to contain buy/sell information
+        size_score=scores[:, 0] * type_bool,
+        average_size=scores[:, 1] * type_bool,
+        type_bool=type_bool,
+        week_date=week_date,
+        )
 
 
 def load_prices(tickers, path_to_price_files):
@@ -101,6 +181,7 @@ def load_prices(tickers, path_to_price_files):
     Parameters:
     - tickers (list of str): List of ticker symbols for which price data is to be loaded.
     - path_to_price_files (str): Path to the directory containing the CSV price files. Each file should be named as '<ticker>.csv'.
+                                 Alternatively, path to a Parquet price store written by `build_price_store`.
 
     Returns:
     - pd.DataFrame: A DataFrame containing columns 'Ticker', 'Date', 'Close', and 'Close_lag'.
@@ -109,21 +190,115 @@ def load_prices(tickers, path_to_price_files):
     Notes:
     - Only the closing prices for Friday are selected and returned.
     """
-    df_prices = pd.DataFrame()
-    for ticker in tickers:
-        df_ticker_price = pd.read_csv(os.path.join(path_to_price_files, f'{ticker}.csv'))
-        df_ticker_price['Ticker'] = ticker
-        df_prices = df_prices.append(df_ticker_price.loc[:, ['Ticker', 'Date', 'Close']])
+    if os.path.splitext(path_to_price_files)[-1] == '.parquet':
+        # Only read the requested tickers from the store
+        df_prices = pq.read_table(
+            path_to_price_files, columns=['Date', 'Close', 'Ticker'], filters=[('Ticker', 'in', list(tickers))]
+            ).to_pandas()
+    else:
+        frames = []
+        for ticker in tickers:
+            df_ticker_price = pv.read_csv(os.path.join(path_to_price_files, f'{ticker}.csv'), convert_options=PRICE_CONVERT_OPTIONS).to_pandas()
+            frames.append(df_ticker_price.assign(Ticker=ticker))
 
-    df_prices['Date'] = pd.to_datetime(df_prices['Date'])
-    df_prices = df_prices[df_prices['Date'].dt.day_of_week == 4]
+        df_prices = pd.concat(frames, ignore_index=True, copy=False)
+
+    df_prices = df_prices[day_of_week(df_prices['Date'].to_numpy()) == 4]
 
     df_prices['Ticker'] = df_prices['Ticker'].astype('category')
-    df_prices['Close_lag'] = df_prices.groupby('Ticker')['Close'].shift(-1)
+    df_prices['Close_lag'] = df_prices.groupby('Ticker', observed=True, sort=False)['Close'].shift(-1)
 
     return df_prices
 
 
+def build_price_store(path_to_price_files, store_fl, cache_key):
+    """
+    Collects the closing prices of every CSV price file into a single Parquet price store.
+
+    Parameters:
+    - path_to_price_files (str): Path to the directory containing the CSV price files. Each file should be named as '<ticker>.csv'.
+    - store_fl (str): Path to the Parquet price store to be written.
+    - cache_key (str): Cache key to store alongside the data (see `compute_cache_key`).
+    """
+    tables = []
+    for price_fl in sorted(pathlib.Path(path_to_price_files).glob('*.csv')):
+        table = pv.read_csv(price_fl, convert_options=PRICE_CONVERT_OPTIONS)
+        tables.append(table.append_column('Ticker', pa.array([price_fl.stem] * table.num_rows, pa.string())))
+
+    table = pa.concat_tables(tables)
+    table = table.replace_schema_metadata({b'cache_key': cache_key.encode()})
+    pq.write_table(table, store_fl, compression='zstd')
+
+
+def compute_cache_key(capitoltrades_fl, path_to_prices):
+    """
+    Computes a key identifying the state of the raw input data used by the backtest.
+
+    Parameters:
+    - capitoltrades_fl (str or None): Path to the Capitol Trades CSV file. If None, only the price files are considered.
+    - path_to_prices (str): Path to the directory containing the CSV price files.
+
+    Returns:
+    - str: Hex digest that changes whenever the trades file or any price file is added, removed or modified.
+    """
+    key = hashlib.md5()
+    if capitoltrades_fl is not None:
+        key.update(str(os.path.getmtime(capitoltrades_fl)).encode())
+    for entry in sorted(os.scandir(path_to_prices), key=lambda x: x.name):
+        key.update(f'{entry.name}:{entry.stat().st_mtime}'.encode())
+    return key.hexdigest()
+
+
+def is_cache_fresh(path, cache_key):
+    """
+    Checks whether a Parquet cache file exists and was written for the given cache key.
+
+    Parameters:
+    - path (str): Path to the Parquet cache file.
+    - cache_key (str): Cache key the file must have been written with (see `compute_cache_key`).
+
+    Returns:
+    - bool: True if the cache file can be reused, False otherwise.
+    """
+    if not os.path.exists(path):
+        return False
+
+    metadata = pq.read_schema(path).metadata or {}
+    return metadata.get(b'cache_key') == cache_key.encode()
+
+
+def load_cached_frame(path, cache_key, columns=None):
+    """
+    Loads a DataFrame from a Parquet cache file if it was written for the given cache key.
+
+    Parameters:
+    - path (str): Path to the Parquet cache file.
+    - cache_key (str): Cache key the file must have been written with (see `compute_cache_key`).
+    - columns (list of str, optional): Columns to read. Defaults to all columns.
+
+    Returns:
+    - pd.DataFrame or None: The cached DataFrame, or None if the cache file is missing or stale.
+    """
+    if not is_cache_fresh(path, cache_key):
+        return None
+
+    return pq.read_table(path, columns=columns, use_pandas_metadata=True).to_pandas()
+
+
+def save_cached_frame(df, path, cache_key):
+    """
+    Saves a DataFrame to a snappy-compressed Parquet cache file tagged with the given cache key.
+
+    Parameters:
+    - df (pd.DataFrame): DataFrame to be cached.
+    - path (str): Path to the Parquet cache file.
+    - cache_key (str): Cache key to store alongside the data (see `compute_cache_key`).
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'cache_key': cache_key.encode()})
+    pq.write_table(table, path, compression='snappy')
+
+
 def load_spx(start, end):
     """
     Fetches the S&P 500 index closing prices for Fridays within the specified date range from Yahoo Finance.
@@ -136,71 +311,135 @@ def load_spx(start, end):
     - pd.DataFrame: A DataFrame containing columns 'Ticker' (always 'SPX') and 'Close', representing the
                     S&P 500's closing prices for Thursdays within the specified date range.
     """
-    spx = pdr.get_data_yahoo('^spx', start=start, end=end)
+    spx = yf.download('^spx', start=start, end=end, progress=False, auto_adjust=False)[['Close']]
     spx['Ticker'] = 'SPX'
-    spx = spx.loc[spx.index.day_of_week == 4, ['Ticker', 'Close']]
+    spx = spx.loc[day_of_week(spx.index.to_numpy()) == 4, ['Ticker', 'Close']]
     return spx
 
 
-def select_date_and_merge_with_prices(df_trades_to_copy, df_historical_prices, date):
+def aggregate_and_merge_with_prices(df_trades_to_copy, df_historical_prices):
     """
-    For a given date, selects trades from a provided DataFrame and merges with historical prices.
+    Aggregates trades per week and ticker and merges the aggregates with historical prices.
 
     Parameters:
     - df_trades_to_copy (pd.DataFrame): DataFrame containing the trade data. It should have columns 'week_date',
                                         'ticker', 'average_size', and 'size_score'.
     - df_historical_prices (pd.DataFrame): DataFrame containing historical price data for various assets.
                                            It should have columns 'Date', 'Ticker', 'Close', and 'Close_lag'.
-    - date (datetime.date): The date for which the trades are to be selected and merged with historical prices.
 
     Returns:
-    - pd.DataFrame: A DataFrame representing the portfolio for the given date, merged with historical price data.
-                    It includes computed average sizes and size scores, along with close prices and lagged close prices.
+    - pd.DataFrame: A DataFrame with columns 'week_date', 'ticker', 'size_score', 'average_size', 'Date', 'Close',
+                    and 'Close_lag'. Rows are sorted by week date and, within each week, by size score (ties are
+                    ordered by ticker). Tickers without a closing price or lagged closing price are dropped.
     """
-    portfolio = df_trades_to_copy.loc[(df_trades_to_copy.week_date == date), :].copy()
-    portfolio['ticker'] = portfolio['ticker'].cat.remove_unused_categories()
-    portfolio['date'] = date
-
-    average_size = portfolio.groupby('ticker')['average_size'].sum().to_frame().reset_index()
-    portfolio = portfolio.groupby('ticker')['size_score'].sum().sort_values().to_frame().reset_index()
+    # Sum trades per (week_date, ticker) group of the sorted trades
+    week_dates = df_trades_to_copy['week_date'].to_numpy()
+    ticker_codes = df_trades_to_copy['ticker'].cat.codes.to_numpy()
+    order = np.lexsort((ticker_codes, week_dates))
+    week_dates, ticker_codes = week_dates[order], ticker_codes[order]
+
+    is_group_start = np.ones(len(order), dtype=bool)
+    is_group_start[1:] = (week_dates[1:] != week_dates[:-1]) | (ticker_codes[1:] != ticker_codes[:-1])
+    group_starts = np.flatnonzero(is_group_start)
+
+    sums = np.add.reduceat(df_trades_to_copy[['size_score', 'average_size']].to_numpy(dtype=float)[order], group_starts, axis=0)
+
+    portfolios = pd.DataFrame({
+        'week_date': week_dates[group_starts],
+        'ticker_id': ticker_codes[group_starts].astype('int32'),
+        # Rounded so that offsetting buys and sells net to exactly zero and tie with each other
+        'size_score': np.round(sums[:, 0], 9),
+        'average_size': sums[:, 1],
+        })
+
+    # Join on int32 ticker codes shared with the trades instead of on two differently coded categoricals
+    tickers = df_trades_to_copy['ticker'].cat.categories
+    prices = df_historical_prices[['Date', 'Close', 'Close_lag']].assign(
+        ticker_id=pd.Categorical(df_historical_prices['Ticker'], categories=tickers).codes.astype('int32')
+        )
+    portfolios = portfolios.merge(prices, how='left', left_on=['week_date', 'ticker_id'], right_on=['Date', 'ticker_id'])
+    portfolios.dropna(subset=['Close', 'Close_lag'], inplace=True)
 
-    portfolio = portfolio.merge(average_size, how='left', on='ticker')
-    portfolio = portfolio.merge(df_historical_prices.loc[df_historical_prices.Date == date, :], how='left', left_on='ticker', right_on='Ticker').drop(columns=['Ticker'])
-    portfolio.dropna(subset=['Close', 'Close_lag'], inplace=True)
+    portfolios.insert(1, 'ticker', pd.Categorical.from_codes(portfolios.pop('ticker_id'), categories=tickers))
 
-    return portfolio
+    return portfolios.sort_values(['week_date', 'size_score', 'ticker']).reset_index(drop=True)
 
 
-def compute_holdings(df, wealth, scale):
+@njit(cache=True)
+def hold_positions(start, end, wealth, scale, average_size, weights, holding_value, leverage):
     """
-    Computes the holdings and returns for each asset in the portfolio based on their relative sizes and the total wealth.
+    Computes the holdings of one side (long or short) of the portfolio of a single date.
 
     Parameters:
-    - df (pd.DataFrame): DataFrame containing the portfolio's asset data. It should have columns 'average_size' and 'Close'.
+    - start, end (int): Row range of the positions in the flat portfolio arrays.
     - wealth (float): The current wealth value.
     - scale (float): Scaling factor to adjust the leverage in the assets.
+    - average_size (np.ndarray): Summed average trade size per row.
+    - weights, holding_value, leverage (np.ndarray): Output arrays, filled in for rows start to end.
+    """
+    total = 0.0
+    for j in range(start, end):
+        weights[j] = abs(average_size[j])
+        total += weights[j]
+
+    for j in range(start, end):
+        weights[j] = weights[j] / total if total > 0 else np.nan
+        holding_value[j] = weights[j] * wealth * scale
+        leverage[j] = scale
+
+
+@njit(cache=True)
+def run_backtest(average_size, close, close_lag, starts, ends, portfolio_sample, initial_wealth, short_scale):
+    """
+    Rolls the long-short portfolio wealth forward over all backtested dates.
+
+    Parameters:
+    - average_size, close, close_lag (np.ndarray): Flat portfolio arrays, sorted by date and size score.
+    - starts, ends (np.ndarray): Row range of the portfolio of each backtested date.
+    - portfolio_sample (float): Fraction of the portfolio to be sampled for short and long positions.
+    - initial_wealth (float): Initial starting wealth of investor.
+    - short_scale (float): Leverage of the short side. The long side is levered by 1 + short_scale.
 
     Returns:
-    - pd.DataFrame: Updated DataFrame with additional columns: 'weights', 'holding_value', 'holding_size',
-                    'holding_value_next', and 'week_return_on_position', representing the computed values for the holdings.
-    - float: The new computed wealth value after the returns.
+    - np.ndarray: Wealth before the first date and after each backtested date.
+    - np.ndarray: Weight of each row within its side of the portfolio (0 if not held).
+    - np.ndarray: Value of the position held in each row (0 if not held).
+    - np.ndarray: Leverage of each row, positive for long and negative for short positions (0 if not held).
     """
-    df['weights'] = np.abs(df['average_size']) / np.abs(df['average_size']).sum()
+    n_rows = average_size.shape[0]
+    weights = np.zeros(n_rows)
+    holding_value = np.zeros(n_rows)
+    leverage = np.zeros(n_rows)
 
-    df['holding_value'] = df['weights'] * wealth * scale
+    wealth = np.empty(starts.shape[0] + 1)
+    wealth[0] = initial_wealth
 
-    df['holding_size'] = df['holding_value'] / df['Close']
+    for i in range(starts.shape[0]):
+        start, end = starts[i], ends[i]
+        cutoff = int((end - start) * portfolio_sample)
 
-    df['holding_value_next'] = df['holding_size'] * df['Close_lag']
+        # Dates without an open position carry wealth forward
+        if end == start:
+            wealth[i + 1] = wealth[i]
+            continue
 
-    df['week_return_on_position'] = df['holding_value_next'] - df['holding_value']
+        if cutoff > 0:
+            hold_positions(start, start + cutoff, wealth[i], -short_scale, average_size, weights, holding_value, leverage)
+            hold_positions(end - cutoff, end, wealth[i], 1 + short_scale, average_size, weights, holding_value, leverage)
+        else:
+            hold_positions(start, end, wealth[i], 1.0, average_size, weights, holding_value, leverage)
 
-    wealth_new = df['holding_value_next'].sum()
+        wealth_new = 0.0
+        for j in range(start, end):
+            # NaN weights (all sizes of a side are zero) are skipped, as in pandas' sum
+            if leverage[j] != 0 and not np.isnan(holding_value[j]):
+                wealth_new += holding_value[j] / close[j] * close_lag[j]
+        wealth[i + 1] = wealth_new
 
-    return df, wealth_new
+    return wealth, weights, holding_value, leverage
 
 
-def backtest_portfolio(df_trades_to_copy, df_historical_prices, initial_wealth, dates, portfolio_sample=1/3):
+def backtest_portfolio(df_trades_to_copy, df_historical_prices, initial_wealth, dates, portfolio_sample=1/3, return_holdings=True):
     """
     Backtests a portfolio based on a given set of trade data, historical prices, and date range.
 
@@ -210,45 +449,57 @@ def backtest_portfolio(df_trades_to_copy, df_historical_prices, initial_wealth,
     - dates (iteratable): datetime.date iteratable representing the dates (of Fridays) for which the portfolio is backtested.
     - portfolio_sample (float, optional): Fraction of the portfolio to be sampled for short and long positions.
                                           Defaults to 1/3.
+    - return_holdings (bool, optional): Whether to build the portfolio holdings DataFrame. Defaults to True.
 
     Returns:
     - pd.DataFrame: DataFrame containing 'date' and 'wealth' columns, representing the portfolio's performance over the given dates.
-    - pd.DataFrame: DataFrame containing the portfolio holdings over the backtested period.
+    - pd.DataFrame or None: DataFrame containing the portfolio holdings over the backtested period, None if `return_holdings` is False.
 
     Notes:
     - Backtesting is done by dividing the portfolio into 'short' and 'long' positions based on the `portfolio_sample` value.
     - Wealth is computed based on the performance of these positions.
+    - The date loop runs in `run_backtest` on flat arrays, compiled with numba when it is installed.
     """
-    ws = [initial_wealth]
-
-    df_pf = pd.DataFrame()
-    for i, date in enumerate(dates[1:]):
-        wealth = ws[-1]
-
-        portfolio = select_date_and_merge_with_prices(df_trades_to_copy, df_historical_prices, date)
-
-        cutoff = int(portfolio.shape[0] * portfolio_sample)
-
-        if portfolio.shape[0] > 0:
-
-            short = portfolio[:cutoff].copy()
-            long = portfolio[-cutoff:].copy()
+    portfolios = aggregate_and_merge_with_prices(df_trades_to_copy, df_historical_prices)
 
-            scale = 0.3 if short.shape[0] > 0 else 0.0
+    week_dates = portfolios['week_date'].to_numpy()
+    backtest_dates = pd.DatetimeIndex(dates[1:]).to_numpy()
+    starts = np.searchsorted(week_dates, backtest_dates, side='left')
+    ends = np.searchsorted(week_dates, backtest_dates, side='right')
 
-            long, wealth_long_new = compute_holdings(long, wealth, 1+scale)
-            short, wealth_short_new = compute_holdings(short, wealth, -scale)
+    close = portfolios['Close'].to_numpy(dtype=float)
+    close_lag = portfolios['Close_lag'].to_numpy(dtype=float)
 
-            long['position'] = 'long'
-            short['position'] = 'short'
-
-            df_pf = df_pf.append(pd.concat([long, short]))
-
-            wealth_new = wealth_long_new + wealth_short_new
+    wealth, weights, holding_value, leverage = run_backtest(
+        portfolios['average_size'].to_numpy(dtype=float), close, close_lag,
+        starts, ends, portfolio_sample, float(initial_wealth), 0.3
+        )
 
-        ws.append(wealth_new)
+    df_wealth = pd.DataFrame({'date': dates, 'wealth': wealth})
+    if not return_holdings:
+        return df_wealth, None
+
+    # Per date, list long positions before short positions
+    held = np.flatnonzero(leverage != 0)
+    held = held[np.lexsort((held, leverage[held] < 0, week_dates[held]))]
+
+    holding_size = holding_value[held] / close[held]
+    holding_value_next = holding_size * close_lag[held]
+
+    # Take only the output columns of the held rows, in one pass per column
+    df_pf = pd.DataFrame({
+        col: portfolios[col].take(held).reset_index(drop=True)
+        for col in ['ticker', 'size_score', 'average_size', 'Date', 'Close', 'Close_lag']
+        }).assign(
+        weights=weights[held],
+        holding_value=holding_value[held],
+        holding_size=holding_size,
+        holding_value_next=holding_value_next,
+        week_return_on_position=holding_value_next - holding_value[held],
+        position=np.where(leverage[held] > 0, 'long', 'short'),
+        )
 
-    return pd.DataFrame({'date': dates, 'wealth': ws}), df_pf
+    return df_wealth, df_pf
 
 
 def plot_portfolio_performance(portfolio_wealth, save_path=None):
@@ -287,17 +538,18 @@ def long_short_portfolio_composition(portfolio, date, save_path):
     - save_path (str, optional): If provided, the path (with optional string formatting for date) where the resulting plot 
       should be saved. If not provided, the plot will be shown interactively.
     """
-    long = portfolio[(portfolio.Date == date) & (portfolio.position == 'long')]
-    short = portfolio[(portfolio.Date == date) & (portfolio.position == 'short')]
+    held = (portfolio.Date == date) & (portfolio.weights != 0.0)
+    long = portfolio.loc[held & (portfolio.position == 'long'), ['weights', 'ticker']]
+    short = portfolio.loc[held & (portfolio.position == 'short'), ['weights', 'ticker']]
 
     _, axes= plt.subplots(1, 2, figsize=(13, 7))
 
-    axes[0].pie(long.loc[long.weights != 0.0, 'weights'],
-            labels=long.loc[long.weights != 0.0, 'ticker'],
+    axes[0].pie(long['weights'].to_numpy(),
+            labels=long['ticker'].to_numpy(),
             radius=1.0, autopct="%.1f%%", pctdistance=0.8)
     axes[0].set_title('Long')
-    axes[1].pie(short.loc[short.weights != 0.0, 'weights'],
-            labels=short.loc[short.weights != 0.0, 'ticker'],
+    axes[1].pie(short['weights'].to_numpy(),
+            labels=short['ticker'].to_numpy(),
             radius=0.5, autopct="%.1f%%", pctdistance=0.8)
     axes[1].set_title('Short')
     if save_path is None:
@@ -307,6 +559,14 @@ def long_short_portfolio_composition(portfolio, date, save_path):
     plt.close()
 
 
+def plot_long_short_portfolio_composition(task):
+    """
+    Unpacks a (portfolio, date, save_path) task and passes it to `long_short_portfolio_composition`.
+    Defined at module level so it can be pickled and run in a worker process.
+    """
+    long_short_portfolio_composition(*task)
+
+
 def compute_spx_portfolio(start_date, end_date):
     """
     Compute the relative wealth of the S&P 500 index over a specified date range.
@@ -380,6 +640,21 @@ def main():
         default="./data/portfolios/composition.csv"
         )
 
+    parser.add_argument(
+        "--cache_dirname",
+        help="Directory name where cleaned trades and prices are cached. Default: ./data/cache",
+        type=str,
+        default="./data/cache"
+        )
+
+    parser.add_argument('--use_cache', action='store_true')
+    parser.add_argument('--no-use_cache', dest='use_cache', action='store_false')
+    parser.set_defaults(use_cache=True)
+
+    parser.add_argument('--save_composition', action='store_true')
+    parser.add_argument('--dont_save_composition', dest='save_composition', action='store_false')
+    parser.set_defaults(save_composition=True)
+
     parser.add_argument('--plot_results', action='store_true')
     parser.add_argument('--dont_plot_results', dest='plot_results', action='store_false')
     parser.set_defaults(plot_results=False)
@@ -406,31 +681,35 @@ def main():
     except OSError:
         pass
 
-    print('Loading data')
-    df_trades = pd.read_csv(
-            capitoltrades_fl,
-            parse_dates=[
-                'traded'
-                ],
-            usecols=[
-                'politician',
-                'trade_issuer',
-                'ticker',
-                'traded',
-                'owner',
-                'type',
-                'size',
-                'price'
-                ],
-            dtype={
-                'owner': 'category',
-                'politician': 'category',
-                'type': 'category',
-                },
-        )
-    
-    print('Cleaning data')
-    df_trades = clean_capitol_trades_data(df_trades, PATH_DATA_PRICES)
+    if args.use_cache:
+        try:
+            os.makedirs(args.cache_dirname)
+        except OSError:
+            pass
+
+        cache_key = compute_cache_key(capitoltrades_fl, PATH_DATA_PRICES)
+        trades_cache_fl = os.path.join(args.cache_dirname, 'trades.parquet')
+        prices_cache_fl = os.path.join(args.cache_dirname, 'prices.parquet')
+
+        # The price store only depends on the price files, so it survives updates of the trades file
+        price_store_key = compute_cache_key(None, PATH_DATA_PRICES)
+        price_store_fl = os.path.join(args.cache_dirname, 'price_store.parquet')
+
+    df_trades = None
+    if args.use_cache:
+        df_trades = load_cached_frame(trades_cache_fl, cache_key, columns=['ticker', 'week_date', 'size_score', 'average_size'])
+
+    if df_trades is None:
+        print('Loading data')
+        df_trades = load_capitol_trades(capitoltrades_fl)
+
+        print('Cleaning data')
+        df_trades = clean_capitol_trades_data(df_trades, PATH_DATA_PRICES)
+
+        if args.use_cache:
+            save_cached_frame(df_trades, trades_cache_fl, cache_key)
+    else:
+        print(f'Loaded cleaned data from {trades_cache_fl}')
 
     earliest_date = df_trades.week_date.min()
     today = pd.to_datetime('today')
@@ -447,18 +726,38 @@ def main():
             print('overriding end date to today')
             max_week = today
 
-    print('Loading prices')
-    df_prices = load_prices(df_trades.ticker.dropna().unique(), PATH_DATA_PRICES)
+    df_prices = None
+    if args.use_cache:
+        df_prices = load_cached_frame(prices_cache_fl, cache_key)
+
+    if df_prices is None:
+        print('Loading prices')
+        if args.use_cache:
+            if not is_cache_fresh(price_store_fl, price_store_key):
+                print(f'Building price store {price_store_fl}')
+                build_price_store(PATH_DATA_PRICES, price_store_fl, price_store_key)
+
+            df_prices = load_prices(df_trades.ticker.dropna().unique(), price_store_fl)
+            save_cached_frame(df_prices, prices_cache_fl, cache_key)
+        else:
+            df_prices = load_prices(df_trades.ticker.dropna().unique(), PATH_DATA_PRICES)
+    else:
+        print(f'Loaded prices from {prices_cache_fl}')
 
     # Week freq rounds to Sunday. We want Friday closing prices, so we subtract 2 days.
     dates = pd.date_range(min_week-timedelta(days=7), max_week, freq='W') - timedelta(days=2)
 
     print('Backtesting portfolio')
-    portfolio_wealth, portfolio_holdings = backtest_portfolio(df_trades, df_prices, args.wealth_initial, dates, args.portfolio_sample)
+    # The holdings are only needed for the composition CSV and plots
+    return_holdings = args.save_composition or args.plot_results
+    portfolio_wealth, portfolio_holdings = backtest_portfolio(
+        df_trades, df_prices, args.wealth_initial, dates, args.portfolio_sample, return_holdings
+        )
 
     print('Generating outputs')
     print('# Saving')
-    portfolio_holdings.to_csv(composition_fl, index=False)
+    if args.save_composition:
+        portfolio_holdings.to_csv(composition_fl, index=False)
 
     # Append spx for comparison
     spx = compute_spx_portfolio(dates[0], dates[-1])
@@ -469,10 +768,17 @@ def main():
 
     if args.plot_results:
         print('# Plotting')
+        matplotlib.use('Agg')
         plot_portfolio_performance(portfolio_wealth, os.path.join(PATH_DATA_PORTFOLIOS, 'wealth.png'))
-        for date in portfolio_holdings.Date.unique():
-            long_short_portfolio_composition(portfolio_holdings, date, os.path.join(PATH_DATA_PORTFOLIOS, 'compositions_{}.png'))
-        
+
+        # Render one composition plot per date in parallel, only sending each worker the date's holdings
+        tasks = [
+            (composition, date, os.path.join(PATH_DATA_PORTFOLIOS, 'compositions_{}.png'))
+            for date, composition in portfolio_holdings[['Date', 'position', 'weights', 'ticker']].groupby('Date', sort=False)
+            ]
+        with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=matplotlib.use, initargs=('Agg',)) as executor:
+            list(executor.map(plot_long_short_portfolio_composition, tasks, chunksize=8))
+
 
 if __name__ == '__main__':
     main()
@@ -12,9 +12,14 @@ Furthermore, using the yahoo finance API, it downloads the following data:
     - Historical price data for firms traded by congress members from finance.yahoo.com.
 
 Notes/confessions:
-    - This script was not optimized for speed. It was written to be run once. However,
-      it could be that the webdriver disconnects while scraping ballotpedia.org, in which
-      case, the user would need to adjust the script accordingly as to not re-scrape data.
+    - This script was not optimized for speed. It was written to be run once. If scraping
+      ballotpedia.org is interrupted, rerunning it only scrapes the politicians that were not
+      checkpointed yet (see --cache_dirname below).
+    - Pages, politicians and tickers are scraped concurrently by --n_workers threads. Lower it
+      if the websites start rejecting requests.
+    - CapitolTrades.com pages are fetched with plain HTTP requests while their html holds the
+      trades, and are otherwise rendered in headless browsers (one per thread). Pass
+      --no-try_static_html to always use the browsers.
     - The ballotpedia.org scraping script is very hacky. The website is very unstructured
       and I had to parse it in order (as a list) to get the information.
     - Currently a lot of data scraping fails. We drop any trades with missing prices and
@@ -26,6 +31,13 @@ likely need to change the user_agent and firefox_driver variables.
 Using the --only_scrape_new, you can update already scraped CapitolTrades.com data and
 price data with new data.
 
+Scraped CapitolTrades.com pages (for a day), Ballotpedia.org committee memberships (for a
+week) and Yahoo Finance meta data (for 90 days) are cached in --cache_dirname, so
+interrupted or partly failed runs can be repeated cheaply.
+Price data is not cached separately: tickers that already have a price file are skipped.
+Pass --no-use_cache to always fetch everything. With --savefailed, the failed pages,
+politicians and tickers of each step are saved as JSON next to the step's output.
+
 For reliable use, run the script with only one component activated at a time. I.e., set
 the remaining flags:
     --no-capitoltrades
@@ -39,17 +51,20 @@ Dependences:
     - yfinance
         - https://pypi.org/project/yfinance/
         - pip install yfinance --upgrade --no-cache-dir
-    - pandas_datareader==0.10.0
-        - https://pandas-datareader.readthedocs.io/en/latest/
     - selenium
         - https://selenium-python.readthedocs.io/installation.html
         - Installation can be cumbersome. I used the geckodriver for firefox. I do not have
           more advice to give you. My the odds be ever in your favor. 
     - bs4==4.12.2
         - https://pypi.org/project/bs4/
-
-The script depends on Selenium to scrape data from CapitolTrades.com as the data table is
-loaded dynamically. This package can be cumbersome to install. A bash script is included
+    - lxml
+        - https://lxml.de/ (parses the capitoltrades tables, and is the HTML parser used by bs4)
+    - requests
+        - https://requests.readthedocs.io/ (installed with yfinance)
+
+The script depends on Selenium to scrape data from CapitolTrades.com whenever the data table
+is loaded dynamically (pages are first tried with requests, see --try_static_html).
+Ballotpedia.org pages are static and are fetched with requests. Selenium can be cumbersome to install. A bash script is included
 to help with installation (bash_scripts/install_geckodriver.sh) but is not guaranteed to
 work. If successful, pass the path to the geckodriver to the script using the
 --path_to_geckodriver flag. Only firefox is supported, but Chrome should be easy to
@@ -62,29 +77,47 @@ implement for those with a Chrome webdriver.
 import os
 import pathlib
 import re
+import shutil
+import json
+import hashlib
 import yaml
 import argparse
+import queue
+import random
+import threading
 
-from time import time
+from time import time, sleep
 from tqdm import tqdm
+from contextlib import contextmanager
+from functools import lru_cache
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
+import requests
 import yfinance as yf
-from pandas_datareader import data as pdr
+from yfinance.data import YfData
 
-import numpy as np
 import pandas as pd
 
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+from bs4 import BeautifulSoup, SoupStrainer
 from datetime import timedelta
 
-from utils import flatten_list, date_parser
+from utils import date_parser, PARSED_DATE_FORMAT
+
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:
+    # PyYAML built without libyaml
+    from yaml import SafeDumper as YamlDumper
 # from utils import safe_get_user_agent
 
 from selenium import webdriver
 from selenium.webdriver.firefox.service import Service
 from selenium.webdriver.firefox.options import Options
 
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
@@ -92,46 +125,246 @@ from selenium.webdriver.common.by import By
 # from webdriver_manager.chrome import ChromeDriverManager
 # from webdriver_manager.firefox import GeckoDriverManager
 
-yf.pdr_override()
+
+# Browser-like user agent for the plain HTTP requests to capitoltrades.com and ballotpedia.org
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/117.0'
+
+# Yahoo Finance endpoint behind yfinance's `Ticker.info`. Sector and industry are in its assetProfile module, so only
+# that module is requested instead of all modules `info` downloads.
+YF_QUOTE_SUMMARY_URL = 'https://query2.finance.yahoo.com/v10/finance/quoteSummary/'
+
+# Status codes with which Yahoo Finance rejects quoteSummary requests (e.g. an invalid crumb) rather than a ticker
+YF_REJECTED_STATUS_CODES = (401, 403, 429)
+
+# Ballotpedia date (range) headers of the years we have trading data for
+RECENT_YEAR_PATTERN = re.compile(r'202[0-4]')
+
+# Random pause (in seconds) before each plain HTTP request to capitoltrades.com and ballotpedia.org, so concurrent
+# workers do not hit the sites in lockstep
+REQUEST_JITTER = (0.1, 0.5)
+
+# Rows of the trades table of a capitoltrades page, and the cells of a row
+ROW_XPATH = etree.XPath('(//table)[1]/tbody/tr')
+CELL_XPATH = etree.XPath('./*')
+
+# Only the main content of a ballotpedia page (where the committees are listed) is parsed
+CONTENT_STRAINER = SoupStrainer('div', class_='mw-parser-output')
+
+# Known values of the closed-set capitoltrades columns (scraped with a leading space). Values outside these sets are
+# read as missing by `safe_load_capitoltrades`.
+OWNER_DTYPE = pd.CategoricalDtype([' Child', ' Joint', ' Self', ' Spouse', ' Undisclosed'])
+TYPE_DTYPE = pd.CategoricalDtype([' buy', ' exchange', ' receive', ' sell'])
+
+# Number of tickers whose prices are downloaded per yf.download call
+PRICE_BATCH_SIZE = 50
+
+# How long cached scrape results are reused. Trades shift between capitoltrades pages as new ones are published.
+CAPITOLTRADES_CACHE_DAYS = 1
+BALLOTPEDIA_CACHE_DAYS = 7
+TICKER_META_CACHE_DAYS = 90
+
+
+def make_browser(path_to_geckodriver):
+    """
+    Start a headless Firefox webdriver.
+    Images and stylesheets are not loaded, as only the page's text is scraped, and `get` returns once the DOM is
+    interactive rather than fully loaded (the table rows are waited for explicitly, see `get_html`).
+    """
+    firefox_service = Service(path_to_geckodriver)
+    firefox_options = Options()
+    firefox_options.add_argument('--headless')
+    # firefox_options.set_preference('general.useragent.override', args.user_agent)
+    firefox_options.set_preference('permissions.default.image', 2)
+    firefox_options.set_preference('permissions.default.stylesheet', 2)
+    firefox_options.page_load_strategy = 'eager'
+
+    return webdriver.Firefox(service=firefox_service, options=firefox_options)
 
 
-def get_html(browser, url, delay=5):
-    """Use website URL to get html using beautiful soup."""
-    browser.get(url)
+def make_session():
+    """Start a requests session that keeps connections to a host alive and sends browser-like headers with every request."""
+    session = requests.Session()
+    session.headers.update({'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip, deflate'})
+    return session
 
+
+class BrowserPool:
+    """
+    Hands out headless Firefox webdrivers to worker threads.
+
+    Selenium sessions can not be shared between threads, so a browser is lent to one caller at a time via `borrow`.
+    Returned browsers are reused by later callers and new ones are only started when all others are in use, unless
+    they were started up front with `warm`. All browsers are shut down with `close`.
+    """
+    def __init__(self, path_to_geckodriver):
+        self.path_to_geckodriver = path_to_geckodriver
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._browsers = []
+
+    @contextmanager
+    def borrow(self):
+        """Lend an idle browser (or a newly started one) for the duration of the with-block."""
+        try:
+            browser = self._idle.get_nowait()
+        except queue.Empty:
+            browser = make_browser(self.path_to_geckodriver)
+            with self._lock:
+                self._browsers.append(browser)
+        try:
+            yield browser
+        finally:
+            self._idle.put(browser)
+
+    def warm(self, n_browsers):
+        """
+        Start browsers up front (concurrently) until the pool holds `n_browsers`, so their startup of a few seconds each
+        is not paid one after the other by the first pages scraped.
+        """
+        with self._lock:
+            n_missing = n_browsers - len(self._browsers)
+        if n_missing <= 0:
+            return
+
+        with ThreadPoolExecutor(max_workers=n_missing) as executor:
+            browsers = list(executor.map(lambda _: make_browser(self.path_to_geckodriver), range(n_missing)))
+
+        with self._lock:
+            self._browsers.extend(browsers)
+        for browser in browsers:
+            self._idle.put(browser)
+
+    def close(self):
+        """Shut down all browsers started by the pool."""
+        with self._lock:
+            for browser in self._browsers:
+                browser.quit()
+            self._browsers = []
+            self._idle = queue.Queue()
+
+
+def get_cache_path(cache_dirname, namespace, *key):
+    """Return the cache file path of a key (e.g. a URL or a ticker) within a namespace of the cache directory."""
+    digest = hashlib.md5('|'.join(str(x) for x in key).encode()).hexdigest()
+    return os.path.join(cache_dirname, namespace, digest)
+
+
+def read_cache(path, max_age_days):
+    """Return the content of a cache file, or None if it does not exist or is older than max_age_days."""
     try:
-        element_present = EC.presence_of_element_located((By.TAG_NAME, 'table'))
-        WebDriverWait(browser, delay).until(element_present)
-    except TimeoutException:
-        print("Timed out waiting for page to load")
-        if 'no trades found' in BeautifulSoup(browser.page_source).text.lower():
-            print('Terminating. Reached end of trades.')
+        if time() - os.path.getmtime(path) > max_age_days * 24 * 60 * 60:
             return None
-        else:
-            raise Exception('Scraping failed. Make sure you have reliable internet connection and try again.')
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_cache(path, content):
+    """Write content to a cache file. The file is replaced atomically so concurrent readers never see partial files."""
+    try:
+        os.makedirs(os.path.dirname(path))
+    except OSError:
+        pass
+
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def get_html(browser, url, delay=2, cache_fl=None, retries=2):
+    """
+    Use website URL to get html parsed by lxml.
+    Waits up to `delay` seconds for the first table row to render and reloads the page up to `retries` times (waiting
+    a bit longer each time) if it does not.
+    If cache_fl is given, a recent copy of the page is read from (or the loaded page is written to) that file.
+    """
+    if cache_fl is not None:
+        content = read_cache(cache_fl, CAPITOLTRADES_CACHE_DAYS)
+        if content is not None:
+            return lxml.html.fromstring(content)
+
+    # Wait for the rows rather than the table, which is rendered before its content
+    row_present = EC.presence_of_element_located((By.CSS_SELECTOR, 'table tbody tr'))
+
+    for attempt in range(retries + 1):
+        browser.get(url)
+
+        try:
+            WebDriverWait(browser, delay * (attempt + 1)).until(row_present)
+            break
+        except TimeoutException:
+            print("Timed out waiting for page to load")
+            # Check the rendered text in the browser instead of parsing the page
+            if browser.execute_script("return document.documentElement.innerText.toLowerCase().includes('no trades found')"):
+                print('Terminating. Reached end of trades.')
+                return None
+    else:
+        raise Exception('Scraping failed. Make sure you have reliable internet connection and try again.')
 
     content = browser.page_source
-    soup = BeautifulSoup(content)
-    return soup
+    if cache_fl is not None:
+        write_cache(cache_fl, content)
 
+    return lxml.html.fromstring(content)
 
-def extract_text(child):
-    """Extract text from Politician and Traded Issuer cells."""
+
+def get_static_html(session, url, cache_fl=None, timeout=10):
+    """
+    Use website URL to get html parsed by lxml, with a plain HTTP request instead of a browser.
+    Returns None if the request fails or the html holds no table rows (e.g. because the table is rendered by
+    javascript), in which case the page has to be loaded in a browser with `get_html`.
+    If cache_fl is given, a recent copy of the page is read from (or the fetched page is written to) that file.
+    """
+    if cache_fl is not None:
+        content = read_cache(cache_fl, CAPITOLTRADES_CACHE_DAYS)
+        if content is not None:
+            return lxml.html.fromstring(content)
+
+    sleep(random.uniform(*REQUEST_JITTER))
     try:
-        main_text = child.find('h3').text
-        sub_text = child.find('span').text
-        return main_text, sub_text
-    except AttributeError:
-        return [child.text]
+        response = session.get(url, timeout=timeout)
+    except requests.RequestException:
+        return None
+    if not response.ok:
+        return None
+
+    # Passing the raw bytes lets lxml detect the encoding itself instead of decoding the page first
+    tree = lxml.html.fromstring(response.content)
+    if len(ROW_XPATH(tree)) == 0:
+        return None
+
+    if cache_fl is not None:
+        write_cache(cache_fl, response.text)
+    return tree
+
+
+def extract_text(child):
+    """Extract text from a table cell as a tuple; (main, sub) for Politician and Traded Issuer cells, (text,) otherwise."""
+    main = child.find('.//h3')
+    sub = child.find('.//span')
+    if main is None or sub is None:
+        return (child.text_content(),)
+    return main.text_content(), sub.text_content()
+
+
+def get_row_from_tr(tr):
+    """Extract the cell texts of a table row, skipping the last cell (link to the trade's detail page)."""
+    row = []
+    for cell in CELL_XPATH(tr)[:-1]:
+        row.extend(extract_text(cell))
+    return row
 
 
-def get_table_from_url(browser, url, col_nms, delay=5):
+def get_table_from_url(browser, url, col_nms, delay=2, cache_fl=None):
     """
     Extracts a table from a given URL and returns it as a pandas DataFrame.
 
     Parameters:
     - url (str): The URL from which the table is to be extracted.
     - col_nms (list of str): List of column names to be assigned to the DataFrame.
+    - cache_fl (str, optional): Cache file of the page's html (see `get_html`).
 
     Returns:
     - pd.DataFrame: DataFrame representation of the extracted table, with provided column names.
@@ -139,13 +372,16 @@ def get_table_from_url(browser, url, col_nms, delay=5):
     Notes:
     - Assumes the first table on the page is the target table and the table is well-structured with a 'tbody' tag.
     """
-    soup = get_html(browser, url, delay)
-    if soup is None:
+    tree = get_html(browser, url, delay, cache_fl)
+    if tree is None:
         return None
-    table_html = soup.find('table').find('tbody')
 
-    children = [x for x in table_html.children]
-    table = [flatten_list([extract_text(x) for x in child][:-1]) for child in children]
+    return get_table_from_tree(tree, col_nms)
+
+
+def get_table_from_tree(tree, col_nms):
+    """Returns the first table of a parsed page as a pandas DataFrame with the provided column names (see `get_table_from_url`)."""
+    table = [get_row_from_tr(tr) for tr in ROW_XPATH(tree)]
 
     return pd.DataFrame(table, columns=col_nms)
 
@@ -162,7 +398,9 @@ def safe_load_capitoltrades(path, default=None):
     - Tries to load a CSV file using pandas' read_csv method with specific columns and datatypes.
     - Columns to be parsed as dates: 'traded' and 'published'.
     - Specific columns to be used are 'politician', 'trade_issuer', 'published', 'ticker', 'traded', 'owner', 'type', 'size', and 'price'.
-    - Datatype specifications: 'owner', 'politician', and 'type' are set as category dtype.
+    - Datatype specifications: 'owner', 'politician', 'type', 'ticker', 'trade_issuer' and 'size' are set as category
+      dtype, with the known categories of 'owner' and 'type' given upfront (see OWNER_DTYPE and TYPE_DTYPE).
+    - 'price' is converted to float32, prices that are not numbers (e.g. ' N/A') become NaN.
 
     Returns:
     - DataFrame: A pandas DataFrame containing the loaded data if successful.
@@ -187,192 +425,499 @@ def safe_load_capitoltrades(path, default=None):
                 'price'
                 ],
             dtype={
-                'owner': 'category',
+                'owner': OWNER_DTYPE,
                 'politician': 'category',
-                'type': 'category',
+                'type': TYPE_DTYPE,
+                'ticker': 'category',
+                'trade_issuer': 'category',
+                'size': 'category',
+                'price': str,
                 },
+            engine='c',
+            memory_map=True,
+            low_memory=False,
             )
+        # Prices are scraped as text (e.g. ' 1,208.66' or ' N/A')
+        df['price'] = pd.to_numeric(df['price'].str.replace(',', '', regex=False), errors='coerce').astype('float32')
         return df
     except FileNotFoundError as err:
         return default
 
 
-def scrape_capitoltrades(browser, last_date_scraped=None):
+def append_to_csv(df, path):
+    """
+    Appends a DataFrame to a CSV file, creating the file (with header) if it does not exist yet.
+
+    Parameters:
+    - df (pd.DataFrame): DataFrame to append.
+    - path (str): Path to the CSV file.
+
+    Notes:
+    - The columns of `df` are aligned to the header of an existing file, so rows end up under the right columns even
+      if the file was written with a different column order. Columns missing from the header are dropped.
+    """
+    try:
+        with open(path) as f:
+            header = f.readline().rstrip('\n').split(',')
+    except FileNotFoundError:
+        header = ['']
+
+    if header == ['']:
+        df.to_csv(path, index=False)
+    else:
+        df.reindex(columns=header).to_csv(path, mode='a', header=False, index=False)
+
+
+def commit_partial_csv(partial_path, path, chunksize=100_000):
+    """
+    Appends the rows of a partially written CSV file to a CSV file (see `append_to_csv`) and removes the partial file.
+
+    Parameters:
+    - partial_path (str): Path to the CSV file written while scraping.
+    - path (str): Path to the CSV file the rows are appended to. Created if it does not exist yet.
+    - chunksize (int, optional): Number of rows copied at a time. Defaults to 100_000.
+
+    Notes:
+    - The rows are appended to a copy of `path`, which then replaces `path`, so `path` is never left half written.
+    - Values are copied as text, so they are written exactly as the partial file holds them.
+    """
+    if not os.path.exists(path):
+        os.replace(partial_path, path)
+        return
+
+    tmp_path = f'{path}.tmp'
+    shutil.copyfile(path, tmp_path)
+    for chunk in pd.read_csv(partial_path, dtype=str, keep_default_na=False, chunksize=chunksize):
+        append_to_csv(chunk, tmp_path)
+    os.replace(tmp_path, path)
+    os.remove(partial_path)
+
+
+def save_failed(failed, path):
+    """Save a list of failed pages, politicians or tickers as JSON, so they can be inspected or scraped again."""
+    with open(path, 'w') as f:
+        json.dump([x if isinstance(x, int) else str(x) for x in failed], f, indent=2)
+    print(f'saved failed to {path}')
+
+
+def scrape_capitoltrades(browser_pool, output_fl, last_date_scraped=None, n_workers=8, cache_dirname=None, try_static_html=True):
     """
-    Scrapes trade data from Capitol Trades for all available pages and returns the data as a pandas DataFrame.
+    Scrapes trade data from Capitol Trades for all available pages and appends it to a CSV file.
+
+    Parameters:
+    - browser_pool (BrowserPool): Pool lending each worker thread its own browser.
+    - output_fl (str): CSV file the trades are appended to once all pages are scraped.
+    - last_date_scraped (datetime-like, optional): If given, only trades published after this date are scraped.
+    - n_workers (int, optional): Number of pages fetched concurrently. Defaults to 8.
+    - cache_dirname (str, optional): Directory in which page html is cached for a day, so failed scrapes can be rerun
+                                     without fetching successful pages again. Defaults to no cache.
+    - try_static_html (bool, optional): If True, pages are first fetched with plain HTTP requests, which is much faster
+                                        than rendering them in a browser. Defaults to True.
 
     Returns:
-    - pd.DataFrame: DataFrame with columns corresponding to the trade data from Capitol Trades.
+    - int: Number of trades appended to `output_fl`.
     - list of int: List of page numbers for which scraping failed.
 
     Notes:
-    - The base URL, column names, and the number of pages to scrape are hardcoded within the function.
+    - The base URL and column names are hardcoded within the function.
+    - Pages are written to a partial file next to `output_fl` as soon as they are scraped, so only the pages in flight
+      are held in memory. Only once the scrape completes are the partial file's rows appended to `output_fl`, so an
+      interrupted scrape neither leaves the newest trades in `output_fl` without the older pages (which a rerun with
+      `last_date_scraped` would never fetch) nor duplicates them on a full rerun.
+    - The number of pages is not known upfront, so `n_workers` pages are kept in flight until the end of the trades is
+      reached.
     - If a table cannot be fetched or is empty for a particular page, the page number is appended to the 'failed' list.
+    - As soon as a page's plain HTTP response holds no trades (e.g. because the site renders them with javascript, or
+      the end of the trades is reached), that and all following pages are loaded in a browser instead.
     """
     base_url = 'https://www.capitoltrades.com/trades?per_page=96&page='
     col_nms = ['politician', 'party', 'trade_issuer', 'ticker', 'published', 'traded', 'filed_after', 'owner', 'type', 'size', 'price']
 
-    df = pd.DataFrame()
+    # requests sessions are not guaranteed to be thread-safe, so every worker thread gets its own
+    local = threading.local()
+    sessions = []
+    static_html = threading.Event()
+    if try_static_html:
+        static_html.set()
+
+    def fetch_page(page_num):
+        url = base_url + str(page_num)
+        cache_fl = None if cache_dirname is None else get_cache_path(cache_dirname, 'capitoltrades', url)
+
+        if static_html.is_set():
+            if not hasattr(local, 'session'):
+                local.session = make_session()
+                sessions.append(local.session)
+            tree = get_static_html(local.session, url, cache_fl)
+            if tree is not None:
+                return get_table_from_tree(tree, col_nms)
+            static_html.clear()
+
+        with browser_pool.borrow() as browser:
+            return get_table_from_url(browser, url, col_nms, cache_fl=cache_fl)
+
+    # Left over by an interrupted scrape
+    partial_fl = f'{output_fl}.partial'
+    if os.path.exists(partial_fl):
+        os.remove(partial_fl)
+
+    n_trades = 0
     failed = []
 
-    pages_remaining = True
-    page_num = 1
-    while pages_remaining:
-        if page_num % 10 == 0:
-            print(page_num)
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        # A new page is requested as soon as the oldest one is done, so `n_workers` pages are always in flight. Tables
+        # are handled in page order, so the stopping conditions behave as with a serial scrape.
+        in_flight = deque()
+        next_page_num = 1
+        while True:
+            while len(in_flight) < n_workers:
+                in_flight.append((next_page_num, executor.submit(fetch_page, next_page_num)))
+                next_page_num += 1
 
-        table = get_table_from_url(browser, base_url + str(page_num), col_nms)
-        if table is None:
-            pages_remaining = False
-            continue
+            page_num, future = in_flight.popleft()
+            table = future.result()
 
-        table.published = pd.to_datetime(date_parser(table.published))
-        table.traded = pd.to_datetime(date_parser(table.traded))
+            if page_num % 10 == 0:
+                print(page_num)
 
-        if table.empty:
-            failed.append(page_num)
-        else:
-            df = df.append(table)
+            if table is None:
+                break
+
+            published = pd.to_datetime(date_parser(table.published), format=PARSED_DATE_FORMAT)
+            table.published = published
+            table.traded = pd.to_datetime(date_parser(table.traded), format=PARSED_DATE_FORMAT)
+
+            if table.empty:
+                failed.append(page_num)
 
-        if last_date_scraped is not None:
-            if np.any(table.published <= last_date_scraped):
-                df = df[df.published > last_date_scraped]
+            reached_last_date = False
+            if last_date_scraped is not None:
+                # min skips missing dates, i.e. the same as any of the elementwise comparisons
+                reached_last_date = published.min() <= last_date_scraped
+                table = table[published > last_date_scraped]
+
+            if not table.empty:
+                append_to_csv(table, partial_fl)
+                n_trades += table.shape[0]
+
+            if reached_last_date:
                 break
 
-        page_num += 1
+        # Pages past the end are not needed
+        for _, future in in_flight:
+            future.cancel()
+
+    for session in sessions:
+        session.close()
+
+    if n_trades > 0:
+        commit_partial_csv(partial_fl, output_fl)
 
-    return df, failed
+    return n_trades, failed
 
 
-def scrape_ballotpedia(browser, politicians):
+def get_ballotpedia_content(session, politician, timeout=10):
     """
-    Scrapes committee membership data from Ballotpedia for all available politicians and returns the data as a dict.
+    Fetches a politician's Ballotpedia page and returns its main content.
+
+    Parameters:
+    - session (requests.Session): HTTP session used to fetch the page (see `make_session`).
+    - politician (str): Name of the politician.
+    - timeout (int, optional): Request timeout in seconds. Defaults to 10.
 
     Returns:
-    - dict: Dict with columns corresponding to the committee membership data from Ballotpedia.
-    - list of string: List of politicians for which scraping failed.
+    - bs4.element.Tag or None: The page's main content div, or None if the page could not be fetched or has no main
+                               content.
+
+    Notes:
+    - Ballotpedia pages are static, so no browser is needed (unlike for CapitolTrades.com).
+    """
+    base_url = 'https://ballotpedia.org/'
+
+    sleep(random.uniform(*REQUEST_JITTER))
+    try:
+        response = session.get(base_url + politician.replace(' ', '_'), timeout=timeout)
+    except requests.RequestException:
+        # Timeouts and connection errors only fail this politician, not the whole scrape
+        return None
+    if not response.ok:
+        return None
+
+    return BeautifulSoup(response.content, 'lxml', parse_only=CONTENT_STRAINER).find('div', class_='mw-parser-output')
+
+
+def extract_list_item_text(li):
+    """
+    Extracts the text of a list item, excluding the text of any nested lists (e.g. subcommittees).
+
+    Parameters:
+    - li (bs4.element.Tag): List item.
+
+    Returns:
+    - str: Stripped text of the list item itself.
+    """
+    return ''.join(x for x in li.find_all(string=True) if x.find_parent('li') is li).strip()
+
+
+def scrape_politician_committees(session, politician):
+    """
+    Scrapes the committee membership of a single politician from Ballotpedia.
+
+    Parameters:
+    - session (requests.Session): HTTP session used to fetch the politician's page.
+    - politician (str): Name of the politician.
+
+    Returns:
+    - dict or None: Dict mapping date (range) headers to lists of committees, or None if the page could not be parsed.
+    - bool: True if scraping (partly) failed for this politician.
 
     Notes:
-    This section is a bit shitty. Ballotpedia.org is very unstructured so I need to parse it in order (as a list)
-    to get the information.
-    HTML structure:
+    Ballotpedia.org is very unstructured, but the committee assignments are always laid out in the same order:
     - Header: "Committee assignments"
     - Header: Date range
     - Paragraph: "<NAME> served on the following ... committees:"
     - Unordered list: Committees
+    so it suffices to walk the top-level headers, paragraphs and lists of the main content in order.
     """
-    base_url = 'https://ballotpedia.org/'
+    key = None
+    committee_section, check_next_list = False, False
+    failed = False
+    person_committee_membership = {}
+
+    content = get_ballotpedia_content(session, politician)
+    if content is None:
+        return None, True
+
+    for tag in content.find_all(['h2', 'h3', 'h4', 'p', 'ul'], recursive=False):
+        if tag.name == 'ul':
+            # The list following the paragraph introducing committee membership holds the committees
+            if check_next_list:
+                values = [x for x in map(extract_list_item_text, tag.find_all('li')) if x]
+                if len(values) == 0:
+                    failed = True
+                else:
+                    person_committee_membership[key] = values
+            check_next_list = False
+            continue
 
+        # Lists can be long and their text is not needed, so only headers and paragraphs are flattened to text
+        text = tag.get_text().strip()
+        if tag.name == 'p':
+            check_next_list = (key is not None) and ('committee' in text)
+        elif text == 'Committee assignments':
+            committee_section = True
+        elif committee_section:
+            # We only have trading data for 2020, so any other header (earlier years or the next section) ends the
+            # committee assignments
+            if RECENT_YEAR_PATTERN.search(text) is None:
+                break
+            key = text
+            check_next_list = False
+
+    return person_committee_membership, failed
+
+
+def scrape_ballotpedia(politicians, n_workers=8, cache_dirname=None):
+    """
+    Scrapes committee membership data from Ballotpedia for all available politicians and returns the data as a dict.
+
+    Parameters:
+    - politicians (list of str): Names of the politicians to scrape.
+    - n_workers (int, optional): Number of politicians scraped concurrently. Defaults to 8.
+    - cache_dirname (str, optional): Directory in which the committee membership of every successfully scraped
+                                     politician is checkpointed, so an interrupted scrape resumes where it stopped.
+                                     Defaults to no checkpoints.
+
+    Returns:
+    - dict: Dict with columns corresponding to the committee membership data from Ballotpedia.
+    - list of string: List of politicians for which scraping failed.
+
+    Notes:
+    - Politicians for which scraping (partly) failed are not checkpointed, so they are scraped again on the next run.
+    """
     committee_membership = {}
     failed = []
 
-    for i, politician in enumerate(tqdm(politicians)):
-        skip_line, check_next_line, committee_section = True, False, False
-        key = None
-        person_committee_membership = {}
+    # requests sessions are not guaranteed to be thread-safe, so every worker thread gets its own, which keeps its
+    # connection to ballotpedia.org alive for all politicians scraped by that thread
+    local = threading.local()
+    sessions = []
+
+    def fetch_politician(politician):
+        cache_fl = None if cache_dirname is None else get_cache_path(cache_dirname, 'ballotpedia', politician)
+        if cache_fl is not None:
+            content = read_cache(cache_fl, BALLOTPEDIA_CACHE_DAYS)
+            if content is not None:
+                return json.loads(content), False
+
+        if not hasattr(local, 'session'):
+            local.session = make_session()
+            sessions.append(local.session)
+        person_committee_membership, person_failed = scrape_politician_committees(local.session, politician)
+
+        if cache_fl is not None and person_committee_membership is not None and not person_failed:
+            write_cache(cache_fl, json.dumps(person_committee_membership))
+        return person_committee_membership, person_failed
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        results = executor.map(fetch_politician, politicians)
+        for politician, (person_committee_membership, person_failed) in zip(politicians, tqdm(results, total=len(politicians))):
+            if person_committee_membership is not None:
+                committee_membership[politician] = person_committee_membership
+            if person_failed:
+                failed.append(politician)
+
+    for session in sessions:
+        session.close()
+
+    return committee_membership, failed
+
+
+@lru_cache(maxsize=None)
+def get_yf_ticker(ticker):
+    """Return the (memoized) yfinance Ticker object of a ticker symbol, so its fetched data is reused."""
+    return yf.Ticker(ticker)
+
+
+def get_asset_profile(ticker, timeout=10):
+    """
+    Fetches only the asset profile (which includes sector and industry) of a ticker from Yahoo Finance.
+
+    Parameters:
+    - ticker (str): Ticker symbol.
+    - timeout (int, optional): Request timeout in seconds. Defaults to 10.
+
+    Returns:
+    - dict: The ticker's asset profile.
+
+    Raises:
+    - requests.RequestException: If the request fails or is rejected (e.g. requests.HTTPError).
+    - KeyError, IndexError, TypeError or ValueError: If the response holds no asset profile.
+
+    Notes:
+    - The request is sent through yfinance's shared session, which adds the cookie and crumb Yahoo Finance requires.
+    """
+    data = YfData()
+    response = data.get_raw_json(YF_QUOTE_SUMMARY_URL + ticker, params={'modules': 'assetProfile'}, timeout=timeout)
+    return response['quoteSummary']['result'][0]['assetProfile']
+
+
+def get_ticker_meta(ticker, cache_dirname=None, asset_profile_rejected=None):
+    """
+    Fetches the sector and industry of a ticker from Yahoo Finance.
+
+    Parameters:
+    - ticker (str): Ticker symbol for which meta information is to be fetched.
+    - cache_dirname (str, optional): Directory in which fetched meta information is cached. Defaults to no cache.
+    - asset_profile_rejected (threading.Event, optional): Set as soon as Yahoo Finance rejects an asset profile request
+                                                          (see YF_REJECTED_STATUS_CODES). Once set, the full quote
+                                                          summary is fetched with yfinance's `Ticker.info` right away.
+                                                          Defaults to trying the asset profile for every ticker.
 
-        browser.get(base_url + politician.replace(' ', '_'))
+    Returns:
+    - list or None: [ticker, sector, industry], or None if the meta information could not be fetched.
+    """
+    cache_fl = None if cache_dirname is None else get_cache_path(cache_dirname, 'yahoofinance_meta', ticker)
+    if cache_fl is not None:
+        content = read_cache(cache_fl, TICKER_META_CACHE_DAYS)
+        if content is not None:
+            return [ticker] + json.loads(content)
+
+    info = None
+    if asset_profile_rejected is None or not asset_profile_rejected.is_set():
         try:
-            for line in browser.find_element(By.CLASS_NAME, 'mw-parser-output').text.splitlines():
-                # Skip lines until we find "Committee assignments" header
-                if line == 'Committee assignments':
-                    skip_line = False
-
-                if skip_line:
-                    continue
-
-                # Once we passed "Committee assignments" header we check headers for dates or date ranges.
-                # Every time there is a new date header, we store the previously collected information to a dict.
-                # We only have trading data for 2020, so we can omit earlier years.
-                dates_in_line = re.match(r'.*(202[0-4])', line)
-                if dates_in_line is not None:
-                    check_next_line = True
-
-                    if committee_section:
-                        if len(values) == 0:
-                            failed.append(politician)
-                        else:
-                            person_committee_membership[key] = values
-                        committee_section = False
-
-                    key = line
-                    values = []
-                    continue
-
-                # If we found a date, the next line should introduce committee membership
-                if check_next_line:
-                    if 'committee' in line:
-                        committee_section = True
-
-                    check_next_line = False
-                    continue
-
-                # If the next line introduced committee membership, we should now be in the committee membership section
-                if committee_section:
-                    if (re.match(r'.*(20\d\d)', line) is not None) or (line == ''):
-                        person_committee_membership[key] = values
-                        break
-                    values.append(line)
-
-            committee_membership[politician] = person_committee_membership
-        except NoSuchElementException: #TODO
-            failed.append(politician)
+            info = get_asset_profile(ticker)
+        except requests.HTTPError as err:
+            if err.response is None or err.response.status_code not in YF_REJECTED_STATUS_CODES:
+                # E.g. 404 for unknown tickers, for which the full quote summary has no sector either
+                return None
+            # Fall back on yfinance, which downloads the full quote summary
+            if asset_profile_rejected is not None and not asset_profile_rejected.is_set():
+                asset_profile_rejected.set()
+                print(f'Asset profile request rejected ({err.response.status_code}), using Ticker.info from now on.')
+        except (requests.RequestException, KeyError, IndexError, TypeError, ValueError):
+            return None
 
-    return committee_membership, failed
+    try:
+        if info is None:
+            info = get_yf_ticker(ticker).info
+        meta = [info['sector'], info['industry']]
+    except: # TODO HTTPError:
+        return None
+
+    if cache_fl is not None:
+        write_cache(cache_fl, json.dumps(meta))
+    return [ticker] + meta
 
 
-def collect_ticker_meta(tickers):
+def collect_ticker_meta(tickers, n_workers=8, cache_dirname=None):
     """
     Collects meta information (sector and industry) for a list of tickers using Yahoo Finance.
 
     Parameters:
     - tickers (list of str): List of ticker symbols for which meta information is to be collected.
+    - n_workers (int, optional): Number of tickers looked up concurrently. Defaults to 8.
+    - cache_dirname (str, optional): Directory in which fetched meta information is cached (see `get_ticker_meta`).
 
     Returns:
     - pd.DataFrame: DataFrame containing columns ['ticker', 'sector', 'industry'] with the fetched meta information.
     - list of str: List of ticker symbols for which meta information collection failed.
 
     Notes:
-    - The function relies on Yahoo Finance's `Ticker` API.
+    - Only the asset profile of each ticker is requested, unless Yahoo Finance rejects that request. Then all tickers
+      looked up afterwards fall back on Yahoo Finance's `Ticker` API (see `get_ticker_meta`).
     - If meta information cannot be fetched or is absent for a particular ticker, the ticker symbol is appended to the 'failed' list.
     """
-    df_industry = pd.DataFrame()
+    rows = []
     failed = []
+    asset_profile_rejected = threading.Event()
 
-    for ticker in tickers:
-        tick = yf.Ticker(ticker)
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        rows_or_none = executor.map(lambda ticker: get_ticker_meta(ticker, cache_dirname, asset_profile_rejected), tickers)
+        for ticker, row in zip(tickers, tqdm(rows_or_none, total=len(tickers))):
+            if row is None:
+                failed.append(ticker)
+            else:
+                rows.append(row)
 
-        try:
-            df_industry = df_industry.append(
-                pd.DataFrame(
-                    data=[[ticker, tick.info['sector'], tick.info['industry']]],
-                    columns=['ticker', 'sector', 'industry']
-                )
-            )
-        except: # TODO HTTPError:
-            failed.append(ticker)
+    df_industry = pd.DataFrame(data=rows, columns=['ticker', 'sector', 'industry'])
 
     return df_industry, failed
 
 
 
-def safe_get_data_yahoo(ticker, start_date, end_date):
+def download_ticker_prices(tickers, start_date, end_date, batch_size=PRICE_BATCH_SIZE):
     """
-    Fetch stock data from Yahoo Finance for a specific ticker and date range.
+    Downloads the historical prices of several tickers from Yahoo Finance in batched requests.
 
     Parameters:
-    - ticker (str): Stock ticker symbol (e.g., "AAPL" for Apple Inc.)
+    - tickers (list of str): Stock ticker symbols (e.g., ["AAPL", "GOOG"]).
     - start_date (str or datetime-like): Start date for the data fetch in the format "YYYY-MM-DD" or as a datetime object.
     - end_date (str or datetime-like): End date for the data fetch in the format "YYYY-MM-DD" or as a datetime object.
+    - batch_size (int, optional): Number of tickers per yf.download call. Defaults to PRICE_BATCH_SIZE.
 
     Returns:
-    - DataFrame: A pandas DataFrame containing the fetched stock data, or None if there's a KeyError.
+    - dict: Maps each ticker to a DataFrame with its price data. Tickers that could not be fetched map to an empty DataFrame.
+
+    Notes:
+    - yfinance fetches the tickers of a batch concurrently with its own thread pool.
     """
-    try:
-        df = pdr.get_data_yahoo(ticker, start=start_date, end=end_date)
-        return df
-    except KeyError:
-        return None
+    tickers = list(tickers)
+    prices = {}
+    for i in range(0, len(tickers), batch_size):
+        batch = tickers[i:i + batch_size]
+        df = yf.download(batch, start=start_date, end=end_date, group_by='ticker', threads=True, progress=False, auto_adjust=False)
+
+        if not isinstance(df.columns, pd.MultiIndex):
+            # A single ticker is returned without the ticker column level
+            prices[batch[0]] = df.dropna(how='all')
+            continue
+
+        downloaded = set(df.columns.get_level_values(0))
+        for ticker in batch:
+            prices[ticker] = df[ticker].dropna(how='all') if ticker in downloaded else pd.DataFrame()
+
+    return prices
 
 
 def collect_ticker_prices(tickers, data_path, start_date='2020-09-01', end_date='2023-08-31', light=False):
@@ -393,27 +938,61 @@ def collect_ticker_prices(tickers, data_path, start_date='2020-09-01', end_date=
     Notes:
     - If price data cannot be fetched or is empty for a particular ticker, the ticker symbol is appended to the 'failed_prices' list.
     - Data for each ticker is saved in a separate CSV file, named by the ticker symbol, within the specified directory.
+    - Prices of the tickers without a CSV file are downloaded in batches (see `download_ticker_prices`).
     """
     failed = []
 
-    list_of_files = os.listdir(data_path)
-    for ticker in tickers:
-        if f'{ticker}.csv' in list_of_files:
-            continue
+    list_of_files = set(os.listdir(data_path))
+    missing_tickers = [ticker for ticker in tickers if f'{ticker}.csv' not in list_of_files]
+    if len(missing_tickers) == 0:
+        return failed
 
-        df = safe_get_data_yahoo(ticker, start_date, end_date)
-        if df is None:
-            failed.append(ticker)
-        elif df.empty:
+    prices = download_ticker_prices(missing_tickers, start_date, end_date)
+    for ticker in missing_tickers:
+        df = prices[ticker]
+        if df.empty:
             failed.append(ticker)
         else:
             if light:
-                df = df[pd.to_datetime(df['Date']).dt.day_of_week == 4]
+                df = df[df.index.dayofweek == 4]
             df.to_csv(os.path.join(data_path, f'{ticker}.csv'))
 
     return failed
 
 
+def read_last_date(path, tail_bytes=4096):
+    """
+    Reads the last date of a price CSV file without parsing the whole file.
+
+    Parameters:
+    - path (str): Path to the CSV file.
+    - tail_bytes (int, optional): Number of bytes at the end of the file searched for the last row. Defaults to 4096.
+
+    Returns:
+    - pd.Timestamp or None: Date of the last row, or None if the file has no 'Date' column or no rows.
+
+    Notes:
+    - Only the header and the end of the file are read if 'Date' is the first column (as written by
+      `collect_ticker_prices`). Otherwise the whole 'Date' column is read.
+    """
+    with open(path, 'rb') as f:
+        header = f.readline().decode().strip().split(',')
+        if header[0] == 'Date':
+            f.seek(0, os.SEEK_END)
+            f.seek(max(f.tell() - tail_bytes, len(','.join(header))))
+            lines = [line for line in f.read().splitlines() if line.strip()]
+            try:
+                return pd.Timestamp(lines[-1].split(b',')[0].decode()) if lines else None
+            except ValueError:
+                # Last row longer than tail_bytes
+                pass
+
+    if 'Date' not in header:
+        return None
+    dates = pd.to_datetime(pd.read_csv(path, usecols=['Date']).Date)
+    return None if dates.empty else dates.max()
+
+
 def collect_and_append_ticker_prices(tickers, data_path, start_date='2020-09-01', end_date='2023-08-31', light=False):
     """
     Collect stock data for a list of tickers and append or create .csv files at the specified path.
@@ -427,36 +1006,39 @@ def collect_and_append_ticker_prices(tickers, data_path, start_date='2020-09-01'
 
     Behavior:
     - For each ticker:
-      1. If a .csv file exists, it will read the file and append new data after the latest date in the file.
+      1. If a .csv file exists, it will read the file's last date and append new data after it to the file.
       2. If no .csv file exists for a ticker, it will fetch the data for the specified date range and create a new .csv file.
+    - Tickers with the same start date (typically all updated tickers, and all new tickers) are downloaded together
+      in batches (see `download_ticker_prices`).
     """
-    list_of_files = os.listdir(data_path)
+    list_of_files = set(os.listdir(data_path))
+
+    tickers_by_start_date = {}
     for ticker in tickers:
         if f'{ticker}.csv' in list_of_files:
-            df = pd.read_csv(os.path.join(data_path, f'{ticker}.csv'))
+            last_date = read_last_date(os.path.join(data_path, f'{ticker}.csv'))
+            if last_date is None:
+                continue
 
-            if 'Date' not in df.columns:
+            _start_date = last_date + timedelta(days=1)
+            if _start_date.date() == end_date:
                 continue
-            else:
-                df['Date'] = pd.to_datetime(df.Date)
-                df.set_index('Date', inplace=True)
-
-                _start_date = df.index.max() + timedelta(days=1)
-                if _start_date.date() != end_date:
-                    df_new = safe_get_data_yahoo(ticker, _start_date, end_date)
-                    if df_new is None:
-                        continue
-                    elif not df_new.empty:
-                        if light:
-                            df_new = df_new[pd.to_datetime(df_new['Date']).dt.day_of_week == 4]
-                        pd.concat([df, df_new]).to_csv(os.path.join(data_path, f'{ticker}.csv'))
         else:
-            df_new = safe_get_data_yahoo(ticker, start_date, end_date)
-            if df_new is None:
+            _start_date = start_date
+        tickers_by_start_date.setdefault(_start_date, []).append(ticker)
+
+    for _start_date, batch in tickers_by_start_date.items():
+        prices = download_ticker_prices(batch, _start_date, end_date)
+        for ticker in batch:
+            df_new = prices[ticker]
+            if df_new.empty:
                 continue
-            elif not df_new.empty:
-                if light:
-                    df_new = df_new[pd.to_datetime(df_new['Date']).dt.day_of_week == 4]
+
+            if light:
+                df_new = df_new[df_new.index.dayofweek == 4]
+            if f'{ticker}.csv' in list_of_files:
+                append_to_csv(df_new.reset_index(), os.path.join(data_path, f'{ticker}.csv'))
+            else:
                 df_new.to_csv(os.path.join(data_path, f'{ticker}.csv'))
 
 
@@ -497,6 +1079,24 @@ def main():
         type=str,
         )
 
+    parser.add_argument(
+        "--n_workers",
+        help="Number of pages, politicians or tickers scraped concurrently (each browser thread runs its own headless Firefox). Default: 8",
+        type=int,
+        default=8
+        )
+
+    parser.add_argument(
+        "--cache_dirname",
+        help="Directory in which scraped pages and ticker meta data are cached between runs. Default: ./data/cache/scrape",
+        type=str,
+        default="./data/cache/scrape"
+        )
+
+    parser.add_argument('--use_cache', action='store_true')
+    parser.add_argument('--no-use_cache', dest='use_cache', action='store_false')
+    parser.set_defaults(use_cache=True)
+
     parser.add_argument('--capitoltrades', action='store_true')
     parser.add_argument('--no-capitoltrades', dest='capitoltrades', action='store_false')
     parser.set_defaults(capitoltrades=True)
@@ -513,6 +1113,10 @@ def main():
     parser.add_argument('--no-yahoofinance_price', dest='yahoofinance_price', action='store_false')
     parser.set_defaults(yahoofinance_price=True)
 
+    parser.add_argument('--try_static_html', action='store_true')
+    parser.add_argument('--no-try_static_html', dest='try_static_html', action='store_false')
+    parser.set_defaults(try_static_html=True)
+
     parser.add_argument('--savefailed', action='store_true')
     parser.add_argument('--no-savefailed', dest='savefailed', action='store_false')
     parser.set_defaults(savefailed=False)
@@ -544,20 +1148,14 @@ def main():
     except OSError:
         pass
 
+    cache_dirname = args.cache_dirname if args.use_cache else None
+
     steps_count = args.capitoltrades + args.ballotpedia + args.yahoofinance_meta + args.yahoofinance_price
 
     assert steps_count != 0, 'Nothing to scrape, all scraping flags (capitoltrades, ballotpedia, yahoofinance_meta, yahoofinance_price) are False!'
-    assert not args.savefailed, 'savefailed is not implemented yet!'
 
     # Selenium set up
     # user_agent = safe_get_user_agent(args.path_to_geckodriver)
-            
-    firefox_service = Service(args.path_to_geckodriver)
-    firefox_options = Options()
-    firefox_options.add_argument('--headless')
-    # firefox_options.set_preference('general.useragent.override', args.user_agent)
-
-    browser = webdriver.Firefox(service=firefox_service, options=firefox_options)
 
     # -------------------------------------------------------------------------
     # Scrape capitoltrades.com trade data
@@ -575,15 +1173,26 @@ def main():
             else:
                 print(f'{capitoltrades_fl} not found. Scraping all capitol trades.')
 
-        t0 = time()
-        df_new, failed_pages = scrape_capitoltrades(browser, last_date_scraped)
-        t_total = time() - t0
+        # One browser per scraping thread. They are started before scraping begins, or on demand if the pages might
+        # not need them. Selenium is only needed for capitoltrades.com, so the browsers are shut down right after (also
+        # if scraping fails).
+        browser_pool = BrowserPool(args.path_to_geckodriver)
+        try:
+            t0 = time()
+            if not args.try_static_html:
+                browser_pool.warm(args.n_workers)
+            n_trades, failed_pages = scrape_capitoltrades(
+                browser_pool, capitoltrades_fl, last_date_scraped, args.n_workers, cache_dirname, args.try_static_html
+                )
+            t_total = time() - t0
+        finally:
+            browser_pool.close()
 
-        df = df.append(df_new)
-        df.to_csv(capitoltrades_fl, index=False)
+        df = safe_load_capitoltrades(capitoltrades_fl, pd.DataFrame())
 
-        # TODO save failed_pages if args.savefailed
-        print(f'time to scrape {df_new.shape[0]} trades: {t_total}')
+        if args.savefailed:
+            save_failed(failed_pages, os.path.splitext(capitoltrades_fl)[0] + '_failed.json')
+        print(f'time to scrape {n_trades} trades: {t_total}')
         print(f'saved to {capitoltrades_fl}')
         print('\nFailed pages:')
         print(failed_pages)
@@ -604,35 +1213,36 @@ def main():
         print('Scraping ballotpedia.com')
 
         t0 = time()
-        committee_membership, failed_politicians = scrape_ballotpedia(df.politician.unique())
+        committee_membership, failed_politicians = scrape_ballotpedia(df.politician.unique(), args.n_workers, cache_dirname)
         t_total = time() - t0
 
         with open(ballotpredia_fl, 'w') as f_nm:
-            yaml.dump(committee_membership, f_nm, default_flow_style=False)
+            yaml.dump(committee_membership, f_nm, Dumper=YamlDumper, default_flow_style=False)
 
-        # TODO save failed_politicians if args.savefailed
+        if args.savefailed:
+            save_failed(failed_politicians, os.path.splitext(ballotpredia_fl)[0] + '_failed.json')
         print(f'time to scrape {len(committee_membership)} politician committee memberships: {t_total}')
         print('\nFailed politicians:')
         print(failed_politicians)
     else:
         print('ballotpedia.com scraping skipped')
 
-    browser.close()
-
     # -------------------------------------------------------------------------
     # Scrape yahoo finance data for traded companies
     # -------------------------------------------------------------------------
     print('\n', '#' * 80)
-    tickers = [x.split(':')[0].strip('$') for x in df.ticker.dropna().unique()]
+    # Different exchange suffixes (e.g. 'X:US', 'X:NYSE') can map to the same ticker, only collect each once
+    tickers = sorted(df.ticker.dropna().drop_duplicates().astype(str).str.split(':').str[0].str.strip('$').unique())
     if args.yahoofinance_meta and not args.only_scrape_new:
         print('Collecting meta data from finance.yahoo.com')
         t0 = time()
-        df_industry, failed_companies = collect_ticker_meta(tickers)
+        df_industry, failed_companies = collect_ticker_meta(tickers, args.n_workers, cache_dirname)
         t_total = time() - t0
 
         df_industry.to_csv(company_metadata_fl)
 
-        # TODO save failed_companies if args.savefailed
+        if args.savefailed:
+            save_failed(failed_companies, os.path.splitext(company_metadata_fl)[0] + '_failed.json')
         print(f'time to download {len(tickers)} company industries: {t_total}')
         print('\nFailed companies:')
         print(failed_companies)
@@ -649,7 +1259,8 @@ def main():
             failed_prices = collect_ticker_prices(tickers, PATH_DATA_PRICES, start_date, end_date)
             t_total = time() - t0
 
-            # TODO save failed_prices if args.savefailed
+            if args.savefailed:
+                save_failed(failed_prices, os.path.normpath(PATH_DATA_PRICES) + '_failed.json')
             print(f'time to download {len(tickers)} company price datasets: {t_total}')
             print('\nFailed companies:')
             print(failed_prices)
@@ -2,8 +2,8 @@
 
 import re
 import string
+from functools import lru_cache
 
-import numpy as np
 import pandas as pd
 import argparse
 
@@ -52,23 +52,34 @@ word_list = [
     'oklahoma state'
 ]
 
+# Bracketed content (e.g. "(Chair)" or "[1]") and punctuation removed from committee names. The negated class matches
+# the same as a lazy r'[\(\[].*?[\)\]]' without backtracking.
+BRACKET_PATTERN = re.compile(r'[\(\[][^\)\]\n]*[\)\]]')
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
 
-def flatten_list(l):
-    """
-    Flattens a nested list (one level deep) into a single list.
+# Committee names dropped entirely (matched case-sensitively before any cleaning)
+HAND_FILTER_PATTERN = re.compile('|'.join(map(re.escape, hand_filter)))
 
-    Parameters:
-    - l (list of lists): A nested list to be flattened.
+# Repairs of words mangled by removing the ranks (e.g. 'man' and 'vice' from 'human services'), applied in a single
+# sweep. ' hu sers' covers 'hu ' -> 'human' followed by ' humansers' -> ' humanservices', which used to be two passes.
+FIXES = {
+    ' hu sers': ' humanservices',
+    'hu ': 'human',
+    ' agement': ' management',
+    ' ufacturing': ' manufacturing',
+    ' sers': ' services',
+    ' humansers': ' humanservices',
+}
+FIX_PATTERN = re.compile('|'.join(map(re.escape, FIXES)))
 
-    Returns:
-    - list: A flattened list containing all the items from the nested list.
+# User agents read by `safe_get_user_agent`, per geckodriver path. Only filled once Firefox started successfully.
+_USER_AGENT_CACHE = {}
 
-    Example:
-    >>> flatten_list([[1, 2], [3, 4], [5]])
-    [1, 2, 3, 4, 5]
-    """
-    return [item for row in l for item in row]
+# Format of the date strings returned by `date_parser`, to be passed to pd.to_datetime
+PARSED_DATE_FORMAT = '%Y %m %d'
 
+# Month numbers of the (abbreviated) month names used by capitoltrades.com
+MONTH_NUMBERS = dict((k, v+1) for v, k in enumerate(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sept', 'Oct', 'Nov', 'Dec']))
 
 
 def date_parser(string_list):
@@ -87,29 +98,31 @@ def date_parser(string_list):
     >>> date_parser(["16 Jan 2021"])
     ['2021 01 16']
     """
-    date_today = pd.datetime.today()
+    date_today = pd.Timestamp.today()
     date_yesterday = date_today - pd.Timedelta(days=1)
-    month_name = dict((k, v+1) for v, k in enumerate(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sept', 'Oct', 'Nov', 'Dec']))
-    month_ix = dict((k+1, v) for k, v in enumerate(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sept', 'Oct', 'Nov', 'Dec']))
+    today_str, yesterday_str = date_today.strftime('%Y %m %d'), date_yesterday.strftime('%Y %m %d')
 
     def catch_today_yesterday(x):
         """
-        x: date_string in the format 'Year Day MonthName.'
+        x: date_string in the format 'Year Day MonthName.', 'Today' or 'Yesterday'.
+        Returns the parsed date of 'Today' and 'Yesterday' (formatted once per call of date_parser), None otherwise.
         """
-        if 'today' in x.lower():
-            return '  {0} {1} {2}'.format(date_today.year, date_today.day, month_ix[int(date_today.month)])
-        elif 'yesterday' in x.lower():
-            return '  {0} {1} {2}'.format(date_yesterday.year, date_yesterday.day, month_ix[int(date_yesterday.month)])
+        x = x.lower()
+        if 'today' in x:
+            return today_str
+        elif 'yesterday' in x:
+            return yesterday_str
         else:
-            return x
+            return None
 
     def YYYYDDMM_to_YYYYMMDD(x):
         """
         x: date_string in the format 'Year Day MonthName.'
         """
-        return f"{x.split(' ')[2]} {int(month_name[x.split(' ')[4]]):02d} {int(x.split(' ')[3]):02d}"
+        parts = x.split(' ')
+        return f"{parts[2]} {MONTH_NUMBERS[parts[4]]:02d} {int(parts[3]):02d}"
 
-    return [YYYYDDMM_to_YYYYMMDD(catch_today_yesterday(x)) for x in string_list]
+    return [catch_today_yesterday(x) or YYYYDDMM_to_YYYYMMDD(x) for x in string_list]
 
 
 def compute_average_from_range(value):
@@ -130,7 +143,25 @@ def compute_average_from_range(value):
     1500000.0
     """
     series = [int(y) for y in value.strip().replace('K', '000').replace('M', '000000').split('–')]
-    return np.mean(np.array(series))
+    return sum(series) / len(series)
+
+
+def compute_average_from_range_series(values):
+    """
+    Computes the average of every range in a pandas Series (see `compute_average_from_range`).
+
+    Parameters:
+    - values (pandas.Series of str): String representations of ranges (e.g., "10K–15K"), e.g. the 'size' column of the
+                                     trades.
+
+    Returns:
+    - pandas.Series of float: The averages of the ranges, NaN where the range is missing.
+
+    Notes:
+    - Trade sizes come from a handful of buckets, so each unique range is only parsed once and mapped onto the Series.
+    """
+    averages = {value: compute_average_from_range(value) for value in values.dropna().unique()}
+    return values.map(averages).astype(float)
 
 
 def check_float_in_range(lb=0.0, ub=0.5):
@@ -157,7 +188,8 @@ def check_float_in_range(lb=0.0, ub=0.5):
         except ValueError:
             raise argparse.ArgumentTypeError(f'{value} is invalid float value')
 
-        if (fl_value > ub) | (fl_value <= lb):
+        # Written as the range itself, so NaN (for which every comparison is False) is rejected as well
+        if not (lb < fl_value <= ub):
             raise argparse.ArgumentTypeError(f'{fl_value} is outside of range ({lb}, {ub}]')
 
         return fl_value
@@ -165,18 +197,34 @@ def check_float_in_range(lb=0.0, ub=0.5):
 
 
 def safe_get_user_agent(path_to_geckodriver):
+    """
+    Returns the user agent of a headless Firefox, or None if Firefox could not be started.
+    Once a user agent was read, later calls return it without starting the browser again.
+    Failures are not memoized, so the next call tries to start Firefox again.
+    """
+    if path_to_geckodriver in _USER_AGENT_CACHE:
+        return _USER_AGENT_CACHE[path_to_geckodriver]
+
     try:
         firefox_service = Service(path_to_geckodriver)
         firefox_options = Options()
         firefox_options.add_argument('--headless')
         browser = webdriver.Firefox(service=firefox_service, options=firefox_options)
-        browser.get("https://www.seleniumhq.org/download/")
+    except Exception:
+        return None
+
+    try:
+        # navigator.userAgent is already set on the blank start page, no need to load a website
         user_agent = browser.execute_script("return navigator.userAgent")
-        browser.close()
-        return user_agent
-    except:
+    except Exception:
         return None
-            
+    finally:
+        # quit (rather than close) also shuts down geckodriver
+        browser.quit()
+
+    _USER_AGENT_CACHE[path_to_geckodriver] = user_agent
+    return user_agent
+
 
 def clean_committees(committees):
     """
@@ -190,7 +238,7 @@ def clean_committees(committees):
     - Applies several specific string replacements for common errors or patterns.
     - Strips any leading or trailing white spaces from each committee name.
     - Filters out names that are shorter than 2 characters.
-    - Returns a set of unique committee names.
+    - Returns the unique committee names, in the order of the sorted raw names they were cleaned from.
 
     Parameters:
     - committees (list of str): A list containing committee names to be cleaned.
@@ -202,34 +250,52 @@ def clean_committees(committees):
     - This function relies on several predefined global variables (e.g., `hand_filter`, `ranks`, and `word_list`)
       which should be available in the function's scope.
     - Ensure all necessary global variables are initialized and updated as required.
+    - Results are memoized on the sorted committee names, so cleaning the same list again (in any order) is a lookup.
+
+    Example (outputs of the original cleaning, which removed one rank or word per pass):
+    >>> sorted(clean_committees(['U.S. House Committee on Armed Services', 'US House Committee', 'Covice Chair']))
+    ['co', 'us', 'us armed services']
+    >>> sorted(clean_committees(['Committee on Health and Human Services (Vice Chair)', 'Senate Committee on Manufacturing']))
+    ['health and humanservices', 'manufacturing']
+    """
+    return list(_clean_committees_cached(tuple(sorted(committees))))
+
+
+@lru_cache(maxsize=4096)
+def _clean_committees_cached(committees):
+    """Returns the cleaned, unique committee names of a tuple of names as a tuple (see `clean_committees`)."""
+    return tuple(dict.fromkeys(clean_committee_series(pd.Series(committees, dtype=object))))
+
+
+def clean_committee_series(committees):
     """
-    for flt in hand_filter:
-        committees = [x for x in committees if flt not in x]
+    Vectorised version of `clean_committees` operating on a pandas Series of raw committee names.
 
-    committees = [re.sub("[\(\[].*?[\)\]]", '',  x).lower().translate(str.maketrans('', '', string.punctuation)) for x in committees]
+    Parameters:
+    - committees (pandas.Series of str): Raw committee names, e.g. a long-format column of all politicians.
 
-    for rank in ranks:
-        committees = [x.replace(rank, '') for x in committees]
+    Returns:
+    - pandas.Series of str: The cleaned committee names; filtered out entries are dropped and the index of the
+                            remaining entries is kept. Duplicates are not removed.
+    """
+    committees = committees[~committees.str.contains(HAND_FILTER_PATTERN)]
 
-    for wrd in word_list:
-        committees = [x.replace(wrd, '') for x in committees]
+    #   Most names have no brackets at all, those skip the regex
+    committees = committees.map(lambda x: BRACKET_PATTERN.sub('', x) if ('(' in x or '[' in x) else x)
+    committees = committees.str.lower().str.translate(PUNCTUATION_TABLE)
+
+    #   Ranks and words are removed one after another, in list order, as a single alternation gives different names:
+    #   earlier entries win over overlapping later ones (e.g. 'us house committee on' -> 'us', not ''), and removing
+    #   one can join the text around it into a later one
+    for wrd in ranks + word_list:
+        committees = committees.str.replace(wrd, '', regex=False)
 
     #   Fixes
-    committees = [x.replace('hu ', 'human') for x in committees]
-    committees = [x.replace(' agement', ' management') for x in committees]
-    committees = [x.replace(' ufacturing', ' manufacturing') for x in committees]
-    committees = [x.replace(' sers', ' services') for x in committees]
-    committees = [x.replace(' humansers', ' humanservices') for x in committees]
-    committees = [x.replace('  ', ' ') for x in committees]
-
-    committees = [x.strip() for x in committees]
-    committees = [x for x in committees if len(x) > 1]
-    try:
-        committees.remove('')
-    except ValueError:
-        pass
+    committees = committees.str.replace(FIX_PATTERN, lambda m: FIXES[m.group(0)], regex=True)
+    committees = committees.str.replace('  ', ' ', regex=False)
 
-    return list(set(committees))
+    committees = committees.str.strip()
+    return committees[committees.str.len() > 1]
 
 
 def get_committee_list(df, committee_membership):
@@ -247,41 +313,76 @@ def get_committee_list(df, committee_membership):
                         for a given year, the value is set as NaN.
 
     Notes:
-    - The function uses an auxiliary function `clean_committees` which should preprocess/clean the committee names.
+    - The committees of all politicians are flattened into one long Series and cleaned at once with
+      `clean_committee_series`, then grouped back into one list per politician and trade year.
+    - The periods are matched to the trade years by merging all periods of the politicians onto the unique
+      (politician, trade_year) pairs, rather than by a lookup per pair.
     """
-    df_tmp = df[['politician', 'trade_year']].drop_duplicates().copy()
-    membership = []
-    for politician, trade_year in df_tmp.values:
-        politician_committees = committee_membership.get(politician, {})
-        if politician_committees == {}:
-            membership.append(np.nan)
-            continue
-
-        relevant_key = [k for k in politician_committees.keys() if str(trade_year) in k]
-        if len(relevant_key) == 0:
-            membership.append(np.nan)
-            continue
-
-        membership.append(clean_committees(politician_committees[relevant_key[0]]))
-
-    df_tmp['committees'] = membership
+    keys = ['politician', 'trade_year']
+    df_tmp = df[keys].drop_duplicates().reset_index(drop=True)
+
+    #   The committees of a trade year are those of the first period (e.g. '2021 - 2022') of the politician containing it
+    periods = pd.DataFrame(
+        [(politician, period) for politician, memberships in committee_membership.items() for period in memberships],
+        columns=['politician', 'period']
+        )
+    periods['order'] = range(len(periods))
+    candidates = df_tmp.merge(periods, how='inner', on='politician')
+    in_period = [str(year) in period for year, period in zip(candidates['trade_year'].values, candidates['period'].values)]
+    matched = candidates[pd.Series(in_period, index=candidates.index, dtype=bool)]
+    matched = matched.sort_values('order', kind='mergesort').drop_duplicates(subset=keys)
+
+    #   One row per raw committee of the matched periods. Several trade years usually share a period, so every period
+    #   is cleaned and grouped once and then merged onto all its trade years.
+    period_keys = ['politician', 'period']
+    matched_periods = matched[period_keys].drop_duplicates()
+    matched_periods = matched_periods.assign(committees=[
+        committee_membership[politician][period]
+        for politician, period in zip(matched_periods['politician'].values, matched_periods['period'].values)
+        ])
+    long_df = matched_periods.explode('committees')
+    #   Committee names repeat heavily across politicians and years, so only the categories are cleaned
+    raw_committees = long_df['committees'].astype('category')
+    cleaned = clean_committee_series(pd.Series(raw_committees.cat.categories, dtype=object))
+    long_df['committees'] = raw_committees.cat.codes.map(cleaned)
+    long_df = long_df.dropna(subset=['committees']).drop_duplicates()
+    membership = long_df.groupby(period_keys, sort=False)['committees'].agg(list).reset_index()
+    membership = matched[keys + ['period']].merge(membership, how='inner', on=period_keys)[keys + ['committees']]
+
+    df_tmp = df_tmp.merge(membership, how='left', on=keys)
+    #   A matching period whose committees were all filtered out gives an empty list rather than NaN
+    has_period = pd.MultiIndex.from_frame(df_tmp[keys]).isin(pd.MultiIndex.from_frame(matched[keys]))
+    df_tmp['committees'] = [[] if period and not isinstance(x, list) else x
+                            for period, x in zip(has_period, df_tmp['committees'].values)]
     return df_tmp
 
 
-def encode_committees(df, model):
+def encode_committees(df, model, batch_size=32):
     """
     Encodes the 'committees' column values of a DataFrame using a given model.
 
     Parameters:
     - df (pandas.DataFrame): A DataFrame containing a 'committees' column with lists of committee names to be encoded.
     - model: A pretrained model capable of encoding text (e.g., sentence transformer model).
+    - batch_size (int): Number of committee names passed to the model per batch.
 
     Returns:
     - pandas.DataFrame: The input DataFrame augmented with a new 'encoded_committees' column containing the encoded values.
+
+    Notes:
+    - Every unique committee name is encoded once in a single batched call and the embeddings are looked up per row.
+    - Rows without committee data (NaN, see `get_committee_list`) are left as NaN.
     """
-    encoded_committees = []
-    for committee in df['committees'].values:
-        encoded_committees.append([model.encode(x) for x in committee])
+    committees = df['committees'].values
+    unique_committees = sorted({x for committee in committees if isinstance(committee, list) for x in committee})
+    lookup = {}
+    if len(unique_committees) > 0:
+        embeddings = model.encode(unique_committees, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True)
+        lookup = dict(zip(unique_committees, embeddings))
+
+    encoded_committees = [
+        [lookup[x] for x in committee] if isinstance(committee, list) else committee for committee in committees
+        ]
 
     df['encoded_committees'] = encoded_committees
     return df